@@ -37,11 +37,19 @@
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler
+from cltv_engine import cltv_c_fused
+from retail_io import clean_transactions
 pd.set_option('display.max_columns', None)
 # pd.set_option('display.max_rows', None)
 pd.set_option('display.float_format', lambda x: '%.5f' % x)
 
 df_ = pd.read_excel("datasets/online_retail_II.xlsx", sheet_name="Year 2009-2010")
+
+# Excel'i her çalıştırmada yeniden ayrıştırmamak için temizlenmiş tablo önbellekten okunabilir
+# (ilk okumada cache/ altına Feather olarak yazılır, Excel değişirse yenilenir):
+# from retail_io import read_clean_transactions
+# df_ = read_clean_transactions("datasets/online_retail_II.xlsx", sheet_name="Year 2009-2010")
+
 df = df_.copy()
 df.head()
 df.isnull().sum()
@@ -136,30 +144,11 @@ cltv_c.to_csv("cltc_c.csv")
 
 def create_cltv_c(dataframe, profit=0.10):
 
-    # Veriyi hazırlama
-    dataframe = dataframe[~dataframe["Invoice"].str.contains("C", na=False)]
-    dataframe = dataframe[(dataframe['Quantity'] > 0)]
-    dataframe.dropna(inplace=True)
-    dataframe["TotalPrice"] = dataframe["Quantity"] * dataframe["Price"]
-    cltv_c = dataframe.groupby('Customer ID').agg({'Invoice': lambda x: x.nunique(),
-                                                   'Quantity': lambda x: x.sum(),
-                                                   'TotalPrice': lambda x: x.sum()})
-    cltv_c.columns = ['total_transaction', 'total_unit', 'total_price']
-    # avg_order_value
-    cltv_c['avg_order_value'] = cltv_c['total_price'] / cltv_c['total_transaction']
-    # purchase_frequency
-    cltv_c["purchase_frequency"] = cltv_c['total_transaction'] / cltv_c.shape[0]
-    # repeat rate & churn rate
-    repeat_rate = cltv_c[cltv_c.total_transaction > 1].shape[0] / cltv_c.shape[0]
-    churn_rate = 1 - repeat_rate
-    # profit_margin
-    cltv_c['profit_margin'] = cltv_c['total_price'] * profit
-    # Customer Value
-    cltv_c['customer_value'] = (cltv_c['avg_order_value'] * cltv_c["purchase_frequency"])
-    # Customer Lifetime Value
-    cltv_c['cltv'] = (cltv_c['customer_value'] / churn_rate) * cltv_c['profit_margin']
-    # Segment
-    cltv_c["segment"] = pd.qcut(cltv_c["cltv"], 4, labels=["D", "C", "B", "A"])
+    # Veriyi hazırlama (iptal faturalar, Quantity > 0, dropna tek maskeyle, TotalPrice)
+    dataframe = clean_transactions(dataframe)
+    # total_transaction, total_unit, total_price tek sıralama ile, ardından
+    # avg_order_value, purchase_frequency, churn_rate, profit_margin, customer_value, cltv ve segment
+    cltv_c = cltv_c_fused(dataframe, profit)
 
     return cltv_c
 
@@ -168,6 +157,19 @@ df = df_.copy()
 
 clv = create_cltv_c(df)
 
+##############################################################################################
+#   Büyük Dosyalar İçin Parça Parça Okuma (Streaming)
+##############################################################################################
+
+# Excel sayfası bir kez Parquet'e çevrilir, sonra dosya parça parça okunup temizlenir ve
+# müşteri toplamları birleştirilir; tüm veri aynı anda belleğe alınmaz.
+
+# from retail_io import excel_to_parquet
+# from cltv_engine import stream_cltv_c
+# excel_to_parquet("datasets/online_retail_II.xlsx", "datasets/online_retail_II_2009_2010.parquet",
+#                  sheet_name="Year 2009-2010")
+# clv_stream = stream_cltv_c("datasets/online_retail_II_2009_2010.parquet", profit=0.10)
+
 
 
 
@@ -192,3 +194,60 @@ clv = create_cltv_c(df)
 
 
 
+
+##############################################################################################
+#   Senaryo Analizi (Kâr Oranı ve Churn Varsayımları)
+##############################################################################################
+
+# Müşteri toplamları bir kez hesaplanır, tüm kâr oranı x churn_rate ızgarası tek seferde değerlendirilir.
+# Segmentler cltv'nin sıralamasından geldiği için her senaryoda aynıdır.
+#
+# import numpy as np
+# from cltv_engine import cltv_c_scenarios
+# cube = cltv_c_scenarios(clv, profits=np.arange(0.05, 0.31, 0.01), churn_rates=[0.5, 0.6, 0.7, 0.8])
+# cube.groupby(["profit", "churn_rate", "segment"], observed=True)["cltv"].agg(["mean", "sum"])
+
+##############################################################################################
+#   Belleğe Sığmayan Veri: Aylara Bölünmüş Parquet Üzerinde CLTV (Out-of-Core)
+##############################################################################################
+
+# Temizlenmiş işlemler month=YYYY-MM dizinlerine yazılır; her ay ayrı bir işçi süreçte müşteri
+# toplamlarına indirgenir ve sonuçlar birleştirilir. Ana süreçte yalnızca müşteri tablosu tutulur.
+#
+# from cltv_engine import write_partitioned_transactions, partitioned_cltv_c
+# write_partitioned_transactions("datasets/online_retail_II_2009_2010.parquet", "datasets/transactions")
+# clv_partitioned = partitioned_cltv_c("datasets/transactions", profit=0.10)
+
+##############################################################################################
+#   Segment Kayması (Önceki Çalıştırmayla Karşılaştırma)
+##############################################################################################
+
+# Her çalıştırmanın segment sınırları, özetleri ve müşteri segmentleri cltv_drift/ altına kaydedilir;
+# yeni çalıştırma önceki ham veri okunmadan son kayıtla karşılaştırılır (ilk çalıştırmada None döner).
+#
+# from cltv_engine import cltv_drift_report
+# drift = cltv_drift_report(clv, run="2011-12")
+# drift["psi"], drift["boundaries"], drift["summary"], drift["migration"]
+
+##############################################################################################
+#   Tembel CLTV Zinciri (Lazy Evaluation)
+##############################################################################################
+
+# Formüller kaydedilir, sadece istenen sütunlar için gereken adımlar az sayıda tampon üzerinde hesaplanır.
+#
+# from cltv_engine import LazyCLTV
+# lazy = LazyCLTV(clv[["total_transaction", "total_unit", "total_price"]], profit=0.10).select("cltv", "segment")
+# print(lazy.explain())
+# lazy.collect()
+
+##############################################################################################
+#   Toplu Dışa Aktarım (Parquet)
+##############################################################################################
+
+# cltv_c.to_csv yerine segmente göre row group'lara ayrılmış, sıkıştırılmış Parquet dosyası;
+# okuyan taraf istemediği segmentleri atlar.
+#
+# from cltv_engine import write_cltv, read_cltv, cltv_file_summary
+# write_cltv(cltv_c, "cltv_c.parquet", kind="cltv_c", profit=0.10)
+# read_cltv("cltv_c.parquet", segments=["A"])
+# cltv_file_summary("cltv_c.parquet")
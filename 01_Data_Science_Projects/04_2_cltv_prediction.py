@@ -47,6 +47,9 @@ import matplotlib.pyplot as plt
 from lifetimes import BetaGeoFitter
 from lifetimes import GammaGammaFitter
 from lifetimes.plotting import plot_period_transactions
+from lifetimes_engine import (bgnbd_expected_purchases, customer_lifetime_value, fit_bgnbd, fit_gamma_gamma,
+                              gamma_gamma_expected_profit, lifetimes_summary)
+from retail_io import ThresholdCapper, clean_transactions
 
 pd.set_option('display.max_columns', None)
 pd.set_option('display.width', 500)
@@ -75,6 +78,12 @@ def replace_with_thresholds(dataframe, variable):
 
 df_ = pd.read_excel("datasets/online_retail_II.xlsx",
                     sheet_name="Year 2010-2011")
+
+# Excel'i her çalıştırmada yeniden ayrıştırmamak için temizlenmiş tablo önbellekten okunabilir
+# (ilk okumada cache/ altına Feather olarak yazılır, Excel değişirse yenilenir):
+# from retail_io import read_clean_transactions
+# df_ = read_clean_transactions("datasets/online_retail_II.xlsx", sheet_name="Year 2010-2011")
+
 df = df_.copy()
 df.describe().T
 df.head()
@@ -92,6 +101,13 @@ df = df[df["Price"] > 0]
 replace_with_thresholds(df, "Quantity")
 replace_with_thresholds(df, "Price")
 
+# İki sütunun sınırları tek kantil çağrısında bulunup df üzerinde yerinde uygulanabilir (copy=True ile
+# df değişmez, kopya döner); öğrenilen sınırlar (capper.thresholds) başka bir döneme ya da dosya
+# parçalarına capper.transform ile uygulanır:
+# from retail_io import ThresholdCapper
+# capper = ThresholdCapper(["Quantity", "Price"])
+# capper.fit_transform(df)
+
 df["TotalPrice"] = df["Quantity"] * df["Price"]
 
 today_date = dt.datetime(2011, 12, 11)
@@ -126,6 +142,11 @@ cltv_df["recency"] = cltv_df["recency"] / 7
 
 cltv_df["T"] = cltv_df["T"] / 7
 
+# Aynı tablo tek sıralı geçişte; zaman birimi (freq), gözlem sonu ve kalibrasyon / holdout ayrımı ile:
+# from lifetimes_engine import lifetimes_summary
+# lifetimes_summary(df, observation_end=today_date, freq="W").head()
+# lifetimes_summary(df, observation_end=today_date, calibration_end=dt.datetime(2011, 9, 1)).head()
+
 ##########################################################################################################
 # 2. BG-NBD Modelinin Kurulması
 ##########################################################################################################
@@ -136,6 +157,11 @@ bgf.fit(cltv_df['frequency'],
         cltv_df['recency'],
         cltv_df['T'])
 
+# Aynı parametreler, müşteriler tekil (frequency, recency, T) örüntülerine indirgenip analitik gradyanla:
+# from lifetimes_engine import fit_bgnbd
+# fit_bgnbd(cltv_df['frequency'], cltv_df['recency'], cltv_df['T'], penalizer_coef=0.001)
+# bgf.params_
+
 ############################################################################################################
 # 1 hafta içinde en çok satın alma beklediğimiz 10 müşteri kimdir?
 ############################################################################################################
@@ -187,6 +213,18 @@ cltv_df["expected_purc_3_month"] = bgf.predict(4 * 3,
                                                cltv_df['frequency'],
                                                cltv_df['recency'],
                                                cltv_df['T'])
+
+############################################################################################################
+# Birden Fazla Ufuk Tek Çağrıda (müşteri x ufuk matrisi)
+############################################################################################################
+
+expected_purc = bgnbd_expected_purchases(bgf.params_, [1, 4, 12, 24, 52],
+                                         cltv_df['frequency'],
+                                         cltv_df['recency'],
+                                         cltv_df['T'])
+expected_purc.sum()
+expected_purc.sort_values(4, ascending=False).head(10)
+
 ############################################################################################################
 # Tahmin Sonuçlarının Değerlendirilmesi
 ############################################################################################################
@@ -202,6 +240,12 @@ ggf = GammaGammaFitter(penalizer_coef=0.01)
 
 ggf.fit(cltv_df['frequency'], cltv_df['monetary'])
 
+# Aynı parametreler, müşteriler tekil (frequency, monetary) çiftlerine indirgenip analitik gradyanla;
+# decimals=2 ile monetary kuruşa yuvarlanarak gruplanır (gruplu mod):
+# from lifetimes_engine import fit_gamma_gamma, gamma_gamma_expected_profit
+# gg_params = fit_gamma_gamma(cltv_df['frequency'], cltv_df['monetary'], penalizer_coef=0.01)
+# gamma_gamma_expected_profit(gg_params, cltv_df['frequency'], cltv_df['monetary']).head(10)
+
 ggf.conditional_expected_average_profit(cltv_df['frequency'],
                                         cltv_df['monetary']).head(10)
 
@@ -227,6 +271,14 @@ cltv = ggf.customer_lifetime_value(bgf,
 
 cltv.head()
 
+# Aylık döngü yerine birikimli beklenen satın almalar tek yayında, iskonto matris çarpımıyla; birden çok
+# ufuk (ör. 3, 6, 12 ay) tek çağrıda hesaplanır ve sonuç yukarıdaki ile aynıdır:
+# from lifetimes_engine import customer_lifetime_value
+# customer_lifetime_value(bgf.params_, [3, 6, 12],
+#                         cltv_df['frequency'], cltv_df['recency'], cltv_df['T'],
+#                         ggf.conditional_expected_average_profit(cltv_df['frequency'], cltv_df['monetary']),
+#                         discount_rate=0.01, freq="W").head()
+
 cltv = cltv.reset_index()
 
 cltv_final = cltv_df.merge(cltv, on="Customer ID", how="left")
@@ -253,68 +305,49 @@ cltv_final.groupby("segment").agg(
 ##########################################################################################################
 
 def create_cltv_p(dataframe, month=3):
-    # 1. Veri Ön İşleme
-    dataframe.dropna(inplace=True)
-    dataframe = dataframe[~dataframe["Invoice"].str.contains("C", na=False)]
-    dataframe = dataframe[dataframe["Quantity"] > 0]
-    dataframe = dataframe[dataframe["Price"] > 0]
-    replace_with_thresholds(dataframe, "Quantity")
-    replace_with_thresholds(dataframe, "Price")
+    # 1. Veri Ön İşleme (dropna, iptal faturalar, Quantity > 0, Price > 0 tek maskeyle)
+    dataframe = clean_transactions(dataframe, positive_price=True)
+    # replace_with_thresholds(dataframe, "Quantity") ve "Price" ile aynı sınırlar, tek kantil çağrısında
+    ThresholdCapper(["Quantity", "Price"]).fit_transform(dataframe)
     dataframe["TotalPrice"] = dataframe["Quantity"] * dataframe["Price"]
     today_date = dt.datetime(2011, 12, 11)
 
-    cltv_df = dataframe.groupby('Customer ID').agg(
-        {'InvoiceDate': [lambda InvoiceDate: (InvoiceDate.max() - InvoiceDate.min()).days,
-                         lambda InvoiceDate: (today_date - InvoiceDate.min()).days],
-         'Invoice': lambda Invoice: Invoice.nunique(),
-         'TotalPrice': lambda TotalPrice: TotalPrice.sum()})
-
-    cltv_df.columns = cltv_df.columns.droplevel(0)
-    cltv_df.columns = ['recency', 'T', 'frequency', 'monetary']
-    cltv_df["monetary"] = cltv_df["monetary"] / cltv_df["frequency"]
-    cltv_df = cltv_df[(cltv_df['frequency'] > 1)]
-    cltv_df["recency"] = cltv_df["recency"] / 7
-    cltv_df["T"] = cltv_df["T"] / 7
-
-    # 2. BG-NBD Modelinin Kurulması
-    bgf = BetaGeoFitter(penalizer_coef=0.001)
-    bgf.fit(cltv_df['frequency'],
-            cltv_df['recency'],
-            cltv_df['T'])
-
-    cltv_df["expected_purc_1_week"] = bgf.predict(1,
-                                                  cltv_df['frequency'],
-                                                  cltv_df['recency'],
-                                                  cltv_df['T'])
-
-    cltv_df["expected_purc_1_month"] = bgf.predict(4,
-                                                   cltv_df['frequency'],
-                                                   cltv_df['recency'],
-                                                   cltv_df['T'])
-
-    cltv_df["expected_purc_3_month"] = bgf.predict(12,
-                                                   cltv_df['frequency'],
-                                                   cltv_df['recency'],
-                                                   cltv_df['T'])
-
-    # 3. GAMMA-GAMMA Modelinin Kurulması
-    ggf = GammaGammaFitter(penalizer_coef=0.01)
-    ggf.fit(cltv_df['frequency'], cltv_df['monetary'])
-    cltv_df["expected_average_profit"] = ggf.conditional_expected_average_profit(cltv_df['frequency'],
-                                                                                 cltv_df['monetary'])
-
-    # 4. BG-NBD ve GG modeli ile CLTV'nin hesaplanması.
-    cltv = ggf.customer_lifetime_value(bgf,
-                                       cltv_df['frequency'],
-                                       cltv_df['recency'],
-                                       cltv_df['T'],
-                                       cltv_df['monetary'],
-                                       time=month,  # 3 aylık
-                                       freq="W",  # T'nin frekans bilgisi.
-                                       discount_rate=0.01)
-
-    cltv = cltv.reset_index()
-    cltv_final = cltv_df.merge(cltv, on="Customer ID", how="left")
+    # haftalık recency, T, frequency ve ortalama monetary; (Customer ID, Invoice) anahtarı üzerinde tek
+    # sıralı geçişte, frequency > 1 müşteriler
+    cltv_df = lifetimes_summary(dataframe, observation_end=today_date, freq="W")
+
+    # 2. BG-NBD Modelinin Kurulması (BetaGeoFitter(penalizer_coef=0.001) ile aynı parametreler)
+    bgf_params = fit_bgnbd(cltv_df['frequency'],
+                           cltv_df['recency'],
+                           cltv_df['T'],
+                           penalizer_coef=0.001)
+
+    # 1, 4 ve 12 haftalık beklenen satın almalar tek çağrıda (bgf.predict ile aynı sonuç)
+    expected_purc = bgnbd_expected_purchases(bgf_params, [1, 4, 12],
+                                             cltv_df['frequency'],
+                                             cltv_df['recency'],
+                                             cltv_df['T'])
+    cltv_df["expected_purc_1_week"] = expected_purc[1]
+    cltv_df["expected_purc_1_month"] = expected_purc[4]
+    cltv_df["expected_purc_3_month"] = expected_purc[12]
+
+    # 3. GAMMA-GAMMA Modelinin Kurulması (GammaGammaFitter(penalizer_coef=0.01) ile aynı parametreler)
+    gg_params = fit_gamma_gamma(cltv_df['frequency'], cltv_df['monetary'], penalizer_coef=0.01)
+    cltv_df["expected_average_profit"] = gamma_gamma_expected_profit(gg_params,
+                                                                     cltv_df['frequency'],
+                                                                     cltv_df['monetary'])
+
+    # 4. BG-NBD ve GG modeli ile CLTV'nin hesaplanması (ggf.customer_lifetime_value ile aynı sonuç)
+    cltv = customer_lifetime_value(bgf_params, month,
+                                   cltv_df['frequency'],
+                                   cltv_df['recency'],
+                                   cltv_df['T'],
+                                   cltv_df["expected_average_profit"],
+                                   discount_rate=0.01,
+                                   freq="W")  # T'nin frekans bilgisi.
+
+    cltv_df["clv"] = cltv[month]
+    cltv_final = cltv_df.reset_index()
     cltv_final["segment"] = pd.qcut(cltv_final["clv"], 4, labels=["D", "C", "B", "A"])
 
     return cltv_final
@@ -326,6 +359,34 @@ cltv_final2 = create_cltv_p(df)
 
 cltv_final2.to_csv("cltv_prediction.csv")
 
+# clv nokta tahminine bootstrap güven aralıkları (örüntüler üzerinde çok terimli ağırlıklar, iki model
+# işlem havuzunda tam veri parametrelerinden başlayarak yeniden kurulur):
+# from lifetimes_engine import bootstrap_cltv
+# intervals = bootstrap_cltv(cltv_final2['frequency'], cltv_final2['recency'], cltv_final2['T'],
+#                            cltv_final2['monetary'], month=3, n_boot=500, segments=cltv_final2['segment'], seed=42)
+# intervals['customers'].head()
+# intervals['segments']
+
+# Parquet (segmente göre row group'lar, zstd): cltv_engine.write_cltv / read_cltv
+# from cltv_engine import write_cltv, read_cltv
+# write_cltv(cltv_final2, "cltv_prediction.parquet", kind="cltv_p", month=3)
+# read_cltv("cltv_prediction.parquet", segments=["A", "B"])
+
+##########################################################################################################
+# 7. Büyük Dosyalar İçin Parça Parça Okuma (Streaming)
+##########################################################################################################
+
+# Lifetime veri yapısı (recency, T, frequency, monetary) dosya parça parça okunarak da hazırlanabilir.
+# replace_with_thresholds'un üst sınırları tüm veri üzerinden hesaplandığı için caps olarak verilir.
+
+# from retail_io import excel_to_parquet
+# from lifetimes_engine import stream_lifetimes_summary
+# excel_to_parquet("datasets/online_retail_II.xlsx", "datasets/online_retail_II_2010_2011.parquet",
+#                  sheet_name="Year 2010-2011")
+# cltv_df_stream = stream_lifetimes_summary("datasets/online_retail_II_2010_2011.parquet",
+#                                           caps={"Quantity": outlier_thresholds(df, "Quantity")[1],
+#                                                 "Price": outlier_thresholds(df, "Price")[1]})
+
 
 
 
@@ -41,11 +41,19 @@
 
 import datetime as dt
 import pandas as pd
+from rfm_engine import rfm_metrics, rfm_scores, write_rfm
+from retail_io import clean_transactions
 pd.set_option('display.max_columns', None)
 # pd.set_option('display.max_rows', None)
 pd.set_option('display.float_format', lambda x: '%.3f' % x)
 
 df_ = pd.read_excel("C:/Users/onurc/Documents/GitHub/dataScienceRepository/00_Data_Source/online_retail_II.xlsx", sheet_name="Year 2009-2010")
+
+# Excel'i her çalıştırmada yeniden ayrıştırmamak için temizlenmiş tablo önbellekten okunabilir
+# (ilk okumada cache/ altına Feather olarak yazılır, Excel değişirse yenilenir):
+# from retail_io import read_clean_transactions
+# df_ = read_clean_transactions("datasets/online_retail_II.xlsx", sheet_name="Year 2009-2010")
+
 df = df_.copy()
 df.head()
 df.shape
@@ -162,48 +170,22 @@ rfm.to_csv("rfm.csv")
 # 7. Tüm Sürecin Fonksiyonlaştırılması
 ###############################################################
 
-def create_rfm(dataframe, csv=False):
+def create_rfm(dataframe, csv=False, binary=False):
 
-    # VERIYI HAZIRLAMA
-    dataframe["TotalPrice"] = dataframe["Quantity"] * dataframe["Price"]
-    dataframe.dropna(inplace=True)
-    dataframe = dataframe[~dataframe["Invoice"].str.contains("C", na=False)]
+    # VERIYI HAZIRLAMA (dropna + iptal faturalar tek maskeyle, TotalPrice)
+    dataframe = clean_transactions(dataframe, positive_quantity=False)
 
     # RFM METRIKLERININ HESAPLANMASI
     today_date = dt.datetime(2011, 12, 11)
-    rfm = dataframe.groupby('Customer ID').agg({'InvoiceDate': lambda date: (today_date - date.max()).days,
-                                                'Invoice': lambda num: num.nunique(),
-                                                "TotalPrice": lambda price: price.sum()})
-    rfm.columns = ['recency', 'frequency', "monetary"]
-    rfm = rfm[(rfm['monetary'] > 0)]
-
-    # RFM SKORLARININ HESAPLANMASI
-    rfm["recency_score"] = pd.qcut(rfm['recency'], 5, labels=[5, 4, 3, 2, 1])
-    rfm["frequency_score"] = pd.qcut(rfm["frequency"].rank(method="first"), 5, labels=[1, 2, 3, 4, 5])
-    rfm["monetary_score"] = pd.qcut(rfm['monetary'], 5, labels=[1, 2, 3, 4, 5])
-
-    # cltv_df skorları kategorik değere dönüştürülüp df'e eklendi
-    rfm["RFM_SCORE"] = (rfm['recency_score'].astype(str) +
-                        rfm['frequency_score'].astype(str))
-
-
-    # SEGMENTLERIN ISIMLENDIRILMESI
-    seg_map = {
-        r'[1-2][1-2]': 'hibernating',
-        r'[1-2][3-4]': 'at_risk',
-        r'[1-2]5': 'cant_loose',
-        r'3[1-2]': 'about_to_sleep',
-        r'33': 'need_attention',
-        r'[3-4][4-5]': 'loyal_customers',
-        r'41': 'promising',
-        r'51': 'new_customers',
-        r'[4-5][2-3]': 'potential_loyalists',
-        r'5[4-5]': 'champions'
-    }
-
-    rfm['segment'] = rfm['RFM_SCORE'].replace(seg_map, regex=True)
-    rfm = rfm[["recency", "frequency", "monetary", "segment"]]
-    rfm.index = rfm.index.astype(int)
+    rfm = rfm_metrics(dataframe, today_date)
+
+    # RFM SKORLARI VE SEGMENTLER (ikili dosya için skorlar da tutulur)
+    rfm = rfm_scores(rfm, keep_scores=binary)
+
+    # kompakt ikili format (int32/uint16/uint32/float32, uint8 skorlar + kategorik segment), read_rfm ile okunur
+    if binary:
+        write_rfm(rfm, "rfm.feather")
+        rfm = rfm.drop(columns=["recency_score", "frequency_score", "monetary_score"])
 
     if csv:
         rfm.to_csv("rfm.csv")
@@ -223,3 +205,66 @@ rfm_new = create_rfm(df, csv=True)
 
 
 
+
+###############################################################
+# 8. Artımlı RFM (Incremental RFM)
+###############################################################
+
+# Gece çalışan işte tüm geçmişi yeniden taramak yerine müşteri durumu rfm_state.pkl dosyasında tutulur
+# ve sadece yeni günün faturaları eklenir. new_day_df, create_rfm'deki gibi hazırlanmış
+# (TotalPrice hesaplanmış, boş değerler ve iptaller çıkarılmış) yeni satırlardır.
+# Aynı satırlar iki kez eklenirse monetary iki kez toplanır.
+
+# from rfm_engine import incremental_rfm
+# rfm_daily = incremental_rfm(new_day_df, "rfm_state.pkl", today_date=dt.datetime(2011, 12, 11))
+
+###############################################################
+# 9. Büyük Dosyalar İçin Parça Parça Okuma (Streaming)
+###############################################################
+
+# Excel sayfası bir kez Parquet'e çevrilir, sonra dosya 1M satırlık parçalar halinde okunur.
+# Her parça ayrı temizlenir (boş değerler, iptaller, Quantity <= 0) ve müşteri toplamlarına eklenir;
+# bellek kullanımı dosya boyutundan bağımsız kalır.
+
+# from retail_io import excel_to_parquet
+# from rfm_engine import stream_rfm, rfm_scores
+# excel_to_parquet("datasets/online_retail_II.xlsx", "datasets/online_retail_II_2010_2011.parquet",
+#                  sheet_name="Year 2010-2011")
+# rfm_stream = rfm_scores(stream_rfm("datasets/online_retail_II_2010_2011.parquet"))
+
+###############################################################
+# 10. Aylık RFM ve Segment Geçişleri (Monthly Snapshots & Transitions)
+###############################################################
+
+# Her ay sonu için o günün sonuna kadarki faturalarla (ay sonu günü dahil) RFM segmentleri tek geçişte hesaplanır.
+# segment_transitions ardışık iki ay arasındaki segment -> segment geçiş matrislerini verir,
+# örneğin champions müşterilerinin bir ay sonra ne kadarının at_risk'e düştüğü.
+
+# from rfm_engine import rfm_snapshots, segment_transitions
+# snapshots = rfm_snapshots(df, pd.date_range("2010-01-31", "2011-12-31", freq="ME"))
+# transitions = segment_transitions(snapshots, normalize=True)
+# transitions[(pd.Timestamp("2011-10-31"), pd.Timestamp("2011-11-30"))]
+
+###############################################################
+# 11. Ülke Bazında RFM (RFM Scores per Country)
+###############################################################
+
+# Çeyreklikler tüm müşteriler yerine her ülkenin kendi müşterileri içinde hesaplanır.
+# Ülkeler ayrı süreçlerde skorlanır; 5 çeyreğe bölünemeyecek kadar küçük ülkeler uyarı ile atlanır.
+
+# from rfm_engine import partitioned_rfm
+# rfm_country = partitioned_rfm(df, key="Country", today_date=dt.datetime(2011, 12, 11))
+# rfm_country.loc["Germany"]
+
+###############################################################
+# 12. Çok Büyük Müşteri Tabanları İçin Yaklaşık Skorlar (Approximate Scores)
+###############################################################
+
+# Müşteriler bölümlere ayrılmışsa her bölüm için küçük bir kantil özeti kurulur, özetler birleştirilir
+# ve her bölüm bu ortak sınırlarla ayrı skorlanır. recency/monetary sınırları yaklaşık (eps),
+# frequency skorları pd.qcut(rank(method="first")) ile birebir aynıdır.
+
+# from rfm_engine import rfm_sketches, merge_rfm_sketches, rfm_scores_approx
+# parts = [rfm_metrics(part_df) for part_df in partition_dfs]
+# merged, offsets = merge_rfm_sketches([rfm_sketches(part, eps=0.01) for part in parts])
+# rfm_approx = pd.concat([rfm_scores_approx(part, merged, offset) for part, offset in zip(parts, offsets)])
@@ -0,0 +1,1106 @@
+###############################################################
+# Performans Ölçümleri (Benchmarks)
+###############################################################
+
+# Online Retail II şeklinde sentetik veri üretip yeni bileşenleri eski yöntemlerle karşılaştırır.
+# Kullanım:
+#   python benchmarks.py                       # tüm ölçümler
+#   python benchmarks.py rfm_metrics --rows 2000000
+
+import argparse
+import asyncio
+import datetime as dt
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from rfm_engine import (rfm_metrics, rfm_scores, empty_rfm_state, load_rfm_state, save_rfm_state,
+                        update_rfm_state, rfm_from_state, stream_rfm, rfm_segments, SEG_MAP,
+                        rfm_snapshots, segment_transitions, partitioned_rfm, rfm_sketches, merge_rfm_sketches,
+                        rfm_scores_approx, write_rfm, read_rfm)
+from cltv_engine import (cltv_c_metrics, cltv_c_fused, cltv_c_scenarios, write_partitioned_transactions,
+                         partitioned_cltv_c, cltv_drift_report, LazyCLTV, write_cltv, read_cltv)
+from lifetimes_engine import (bgnbd_expected_purchases, bgnbd_patterns, bootstrap_cltv, customer_lifetime_value,
+                              fit_bgnbd, fit_gamma_gamma, gamma_gamma_expected_profit, gamma_gamma_patterns,
+                              lifetimes_summary, lifetimes_summary_from_aggregates, stream_lifetimes_summary)
+from retail_io import (ThresholdCapper, clean_transactions, read_clean_transactions, encode_invoices,
+                       distinct_invoice_counts, pack_invoice_pairs, stream_customer_aggregates)
+from rfm_service import RFMIndex, start_server
+
+
+###############################################################
+# Sentetik Veri (Synthetic Online Retail II)
+###############################################################
+
+def make_online_retail(n_rows=10_000_000, n_customers=None, seed=42, invoice_offset=0):
+    # Her fatura ortalama 20 satırdan oluşur, faturaların %2'si iptal ("C" ile başlar),
+    # satırların yaklaşık %20'sinde Customer ID boştur.
+    rng = np.random.default_rng(seed)
+    n_invoices = max(n_rows // 20, 1)
+    n_customers = n_customers or max(n_rows // 200, 1)
+
+    invoice_ids = np.sort(rng.integers(0, n_invoices, n_rows))
+    cancelled = rng.random(n_invoices) < 0.02
+    invoice_labels = np.where(cancelled, "C", "") + (489434 + invoice_offset + np.arange(n_invoices)).astype(str)
+
+    customers = (12346 + rng.integers(0, n_customers, n_invoices)).astype(float)
+    customers[rng.random(n_invoices) < 0.20] = np.nan
+
+    start = np.datetime64("2009-12-01T07:00:00")
+    seconds = np.sort(rng.integers(0, 739 * 24 * 3600, n_invoices))
+    invoice_dates = start + seconds.astype("timedelta64[s]")
+
+    n_products = 4000
+    stock_labels = (10000 + np.arange(n_products)).astype(str)
+    products = rng.integers(0, n_products, n_rows)
+    countries = np.array(["United Kingdom", "Germany", "France", "EIRE", "Spain",
+                          "Netherlands", "Belgium", "Switzerland", "Portugal", "Australia"])
+    country_of_customer = rng.choice(len(countries), n_customers + 1,
+                                     p=[0.82, 0.04, 0.04, 0.02, 0.02, 0.02, 0.01, 0.01, 0.01, 0.01])
+
+    quantity = rng.integers(1, 25, n_rows)
+    quantity[cancelled[invoice_ids]] *= -1
+    price = np.round(rng.gamma(1.5, 2.5, n_rows), 2)
+
+    customer_rows = customers[invoice_ids]
+    country_codes = country_of_customer[np.nan_to_num(customer_rows - 12346, nan=n_customers).astype(int)]
+
+    return pd.DataFrame({
+        "Invoice": pd.Categorical.from_codes(invoice_ids, invoice_labels).astype(object),
+        "StockCode": pd.Categorical.from_codes(products, stock_labels).astype(object),
+        "Description": pd.Categorical.from_codes(products, np.char.add("PRODUCT ", stock_labels)).astype(object),
+        "Quantity": quantity,
+        "InvoiceDate": invoice_dates[invoice_ids].astype("datetime64[ns]"),
+        "Price": price,
+        "Customer ID": customer_rows,
+        "Country": pd.Categorical.from_codes(country_codes, countries).astype(object),
+    })
+
+
+def clean_online_retail(dataframe):
+    # create_rfm içindeki hazırlık adımları
+    dataframe = dataframe.copy()
+    dataframe["TotalPrice"] = dataframe["Quantity"] * dataframe["Price"]
+    dataframe.dropna(inplace=True)
+    return dataframe[~dataframe["Invoice"].str.contains("C", na=False)]
+
+
+def timeit(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def peak_memory(func, *args, **kwargs):
+    # numpy/pandas tamponları tracemalloc tarafından izlenir
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+def rss_high_water(func, *args, **kwargs):
+    # Arrow string tamponları tracemalloc'ta görünmez; süreç RSS tepe değeri (VmHWM) sıfırlanıp
+    # fonksiyon sonrası okunur (Linux, /proc/self/clear_refs)
+    import ctypes
+    import pyarrow as pa
+
+    def status(key):
+        with open("/proc/self/status") as file:
+            return next(int(line.split()[1]) * 1024 for line in file if line.startswith(key))
+
+    # serbest bırakılmış ama süreçte tutulan bellek işletim sistemine geri verilir,
+    # aksi halde yeniden kullanılan sayfalar tepe değerini artırmaz
+    pa.default_memory_pool().release_unused()
+    ctypes.CDLL("libc.so.6").malloc_trim(0)
+    with open("/proc/self/clear_refs", "w") as file:
+        file.write("5")
+    baseline = status("VmRSS")
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    return seconds, status("VmHWM") - baseline, result
+
+
+def report(title, rows):
+    print(f"\n{title}")
+    for label, seconds in rows:
+        print(f"  {label:<40} {seconds:10.3f} s")
+
+
+###############################################################
+# RFM Metrikleri: lambda'lı agg vs. rfm_metrics
+###############################################################
+
+def legacy_rfm_metrics(dataframe, today_date):
+    rfm = dataframe.groupby('Customer ID').agg({'InvoiceDate': lambda date: (today_date - date.max()).days,
+                                                'Invoice': lambda num: num.nunique(),
+                                                "TotalPrice": lambda price: price.sum()})
+    rfm.columns = ['recency', 'frequency', "monetary"]
+    return rfm
+
+
+def bench_rfm_metrics(n_rows):
+    today_date = dt.datetime(2011, 12, 11)
+    df = clean_online_retail(make_online_retail(n_rows))
+    legacy_time, legacy = timeit(legacy_rfm_metrics, df, today_date)
+    engine_time, engine = timeit(rfm_metrics, df, today_date)
+    pd.testing.assert_frame_equal(legacy, engine)
+    report(f"rfm_metrics ({n_rows:,} satır, {len(engine):,} müşteri)",
+           [("groupby.agg + lambda", legacy_time),
+            ("rfm_metrics", engine_time)])
+    print(f"  hızlanma: {legacy_time / engine_time:.1f}x")
+
+
+###############################################################
+# Artımlı RFM: tam yeniden hesaplama vs. günlük delta
+###############################################################
+
+def bench_incremental_rfm(n_rows):
+    today_date = dt.datetime(2011, 12, 11)
+    df = clean_online_retail(make_online_retail(n_rows))
+    days = df["InvoiceDate"].dt.normalize()
+    last_day = days.max()
+    history, delta = df[days < last_day], df[days == last_day]
+    history_days = history["InvoiceDate"].dt.normalize()
+    path = os.path.join(tempfile.mkdtemp(), "rfm_state.pkl")
+
+    def incremental_metrics():
+        state = update_rfm_state(load_rfm_state(path), delta)
+        save_rfm_state(state, path)
+        return rfm_from_state(state, today_date)
+
+    # skorlama (rfm_scores) iki yolda da aynıdır, burada yalnızca metrik aşaması ölçülür
+    rows = []
+    for share in [0.25, 0.50, 0.75, 1.00]:
+        cutoff = history_days.min() + (last_day - history_days.min()) * share
+        past = history[history_days < cutoff]
+        save_rfm_state(update_rfm_state(empty_rfm_state(), past), path)
+        full_time, full = timeit(rfm_metrics, pd.concat([past, delta]), today_date)
+        incr_time, incr = timeit(incremental_metrics)
+        pd.testing.assert_frame_equal(rfm_scores(full), rfm_scores(incr), check_exact=False)
+        rows.append((f"tam hesaplama, geçmiş {len(past):,} satır", full_time))
+        rows.append((f"artımlı, delta {len(delta):,} satır", incr_time))
+    report(f"incremental_rfm ({n_rows:,} satır)", rows)
+
+
+###############################################################
+# Parça Parça Okuma: tüm dosya vs. akış (streaming)
+###############################################################
+
+def bench_streaming(n_rows):
+    today_date = dt.datetime(2011, 12, 11)
+    path = os.path.join(tempfile.mkdtemp(), "online_retail_II.parquet")
+    make_online_retail(n_rows).to_parquet(path, index=False, row_group_size=250_000)
+
+    def read_all():
+        return rfm_metrics(clean_transactions(pd.read_parquet(path)), today_date)
+
+    full_time, full_peak, full = peak_memory(read_all)
+    stream_time, stream_peak, stream = peak_memory(stream_rfm, path, today_date, chunksize=250_000)
+    pd.testing.assert_frame_equal(full, stream, check_exact=False)
+    print(f"\nstreaming ({n_rows:,} satır, parquet)")
+    print(f"  {'tüm dosya':<40} {full_time:10.3f} s {full_peak / 2 ** 20:10.1f} MB tepe")
+    print(f"  {'akış, 250k satırlık parçalar':<40} {stream_time:10.3f} s {stream_peak / 2 ** 20:10.1f} MB tepe")
+
+
+###############################################################
+# Başlangıç Süresi: pd.read_excel vs. Feather önbelleği
+###############################################################
+
+def bench_excel_cache(n_rows):
+    # bir Excel sayfası en fazla 1.048.576 satır alabilir
+    n_rows = min(n_rows, 1_000_000)
+    workdir = tempfile.mkdtemp()
+    xlsx_path = os.path.join(workdir, "online_retail_II.xlsx")
+    cache_dir = os.path.join(workdir, "cache")
+    make_online_retail(n_rows).to_excel(xlsx_path, sheet_name="Year 2009-2010", index=False)
+
+    read_time, raw = timeit(pd.read_excel, xlsx_path, sheet_name="Year 2009-2010")
+    clean_time, excel = timeit(clean_transactions, raw, positive_quantity=False)
+    excel_time = read_time + clean_time
+    cold_time, cold = timeit(read_clean_transactions, xlsx_path, "Year 2009-2010", cache_dir)
+    warm_time, warm = timeit(read_clean_transactions, xlsx_path, "Year 2009-2010", cache_dir)
+    pd.testing.assert_frame_equal(cold, warm)
+    # create_rfm / create_cltv_c / create_cltv_p temizliği önbellekten de Excel'den de aynı satırları verir
+    for options in [{"positive_quantity": False}, {}, {"positive_price": True}]:
+        expected, cached = clean_transactions(raw, **options), clean_transactions(warm, **options)
+        assert len(expected) == len(cached) and np.isclose(expected["TotalPrice"].sum(), cached["TotalPrice"].sum())
+    report(f"excel_cache ({n_rows:,} satır, {len(warm):,} temiz satır)",
+           [("pd.read_excel + temizleme", excel_time),
+            ("önbellek ilk okuma (yazma dahil)", cold_time),
+            ("önbellekten okuma (memory-map)", warm_time)])
+    print(f"  bellek: {excel.memory_usage(deep=True).sum() / 2 ** 20:.1f} MB -> "
+          f"{warm.memory_usage(deep=True).sum() / 2 ** 20:.1f} MB")
+
+
+###############################################################
+# Segment Atama: string + regex vs. 5x5 tablo
+###############################################################
+
+def bench_rfm_segments(n_rows):
+    # burada n_rows müşteri sayısıdır
+    rng = np.random.default_rng(42)
+    recency_score = pd.Series(pd.Categorical(rng.integers(1, 6, n_rows), categories=[5, 4, 3, 2, 1]))
+    frequency_score = pd.Series(pd.Categorical(rng.integers(1, 6, n_rows), categories=[1, 2, 3, 4, 5]))
+
+    def regex_segments():
+        return (recency_score.astype(str) + frequency_score.astype(str)).replace(SEG_MAP, regex=True)
+
+    regex_time, regex = timeit(regex_segments)
+    lookup_time, lookup = timeit(rfm_segments, recency_score, frequency_score)
+    assert (regex.to_numpy() == np.asarray(lookup, dtype=object)).all()
+    report(f"rfm_segments ({n_rows:,} müşteri)",
+           [("astype(str) + replace(regex=True)", regex_time),
+            ("5x5 tablo + kategorik", lookup_time)])
+    print(f"  hızlanma: {regex_time / lookup_time:.0f}x")
+
+
+###############################################################
+# Aylık RFM: tarih başına yeniden hesaplama vs. rfm_snapshots
+###############################################################
+
+def bench_rfm_snapshots(n_rows):
+    df = clean_online_retail(make_online_retail(n_rows))
+    snapshot_dates = pd.date_range("2010-01-31", "2011-12-31", freq="ME")
+
+    def loop(data, dates):
+        # rfm_snapshots ile aynı anlam: her tarih gün sonuna kadar olan faturaları kapsar
+        dates = pd.DatetimeIndex(dates).unique().sort_values()
+        cutoffs = {date: date.normalize() + pd.Timedelta(days=1) for date in dates}
+        return pd.concat({date: rfm_scores(rfm_metrics(data[data["InvoiceDate"] < cutoff], cutoff))
+                          for date, cutoff in cutoffs.items() if (data["InvoiceDate"] < cutoff).any()},
+                         names=["snapshot_date", "Customer ID"])
+
+    loop_time, looped = timeit(loop, df, snapshot_dates)
+    cube_time, cube = timeit(rfm_snapshots, df, snapshot_dates)
+    pd.testing.assert_frame_equal(looped, cube, check_exact=False)
+
+    # veriden önceki tarih, faturasız ara dönem (aynı ay içinde iki tarih), tekrar eden ve sırasız tarihler
+    edge_dates = pd.DatetimeIndex(["2011-06-30", "2009-01-31", "2011-06-15", "2011-06-16",
+                                   "2011-06-30", "2011-12-31", "2011-06-16"])
+    edge_df = df[(df["InvoiceDate"] < "2011-06-16") | (df["InvoiceDate"] >= "2011-07-01")]
+    pd.testing.assert_frame_equal(loop(edge_df, edge_dates), rfm_snapshots(edge_df, edge_dates), check_exact=False)
+
+    transition_time, _ = timeit(segment_transitions, cube)
+    report(f"rfm_snapshots ({n_rows:,} satır, {len(snapshot_dates)} ay sonu)",
+           [("tarih başına rfm_metrics + rfm_scores", loop_time),
+            ("rfm_snapshots", cube_time),
+            ("segment_transitions", transition_time)])
+
+
+###############################################################
+# Ülke Bazında RFM: seri döngü vs. süreç havuzu
+###############################################################
+
+def bench_partitioned_rfm(n_rows):
+    import warnings
+
+    today_date = dt.datetime(2011, 12, 11)
+    df = clean_online_retail(make_online_retail(n_rows))
+
+    def serial():
+        return pd.concat({country: rfm_scores(rfm_metrics(df[df["Country"] == country], today_date))
+                          for country in sorted(df["Country"].unique())},
+                         names=["Country", "Customer ID"])
+
+    serial_time, serial_result = timeit(serial)
+    rows = [("seri döngü (ülke başına filtre + kopya)", serial_time)]
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        pool_time, pooled = timeit(partitioned_rfm, df, "Country", today_date, max_workers=workers)
+        pd.testing.assert_frame_equal(serial_result, pooled)
+        rows.append((f"partitioned_rfm, {workers} işçi", pool_time))
+    # tek müşterili bölüm uyarıyla atlanır; bozuk fatura numaralı bölümün hatası çağırana iletilir
+    single = df[df["Customer ID"] == df["Customer ID"].iloc[0]].assign(Country="Tek")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        assert "Tek" not in partitioned_rfm(pd.concat([df, single]), "Country", today_date, max_workers=1).index
+    try:
+        partitioned_rfm(pd.concat([df, single.assign(Invoice="X-1")]), "Country", today_date, max_workers=1)
+        raise AssertionError("bozuk fatura numarası sessizce atlandı")
+    except ValueError:
+        pass
+    report(f"partitioned_rfm ({n_rows:,} satır, {os.cpu_count()} çekirdek)", rows)
+
+
+###############################################################
+# Çeyreklik Skorları: pd.qcut vs. KLL özeti
+###############################################################
+
+def make_rfm_table(n_customers, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"recency": rng.integers(0, 740, n_customers),
+                         "frequency": rng.geometric(0.3, n_customers),
+                         "monetary": np.round(rng.lognormal(6, 1.2, n_customers), 2)},
+                        index=pd.Index(np.arange(n_customers) + 12346, name="Customer ID"))
+
+
+def bench_rfm_sketch(n_rows, n_partitions=10):
+    # burada n_rows müşteri sayısıdır; müşteriler n_partitions bölüme ayrılır
+    rfm = make_rfm_table(n_rows)
+    partitions = [rfm.iloc[idx] for idx in np.array_split(np.arange(n_rows), n_partitions)]
+
+    exact_time, exact_peak, exact = peak_memory(rfm_scores, rfm)
+    print(f"\nrfm_sketch ({n_rows:,} müşteri, {n_partitions} bölüm)")
+    print(f"  {'pd.qcut (tüm sütunlar tek yerde)':<40} {exact_time:10.3f} s {exact_peak / 2 ** 20:10.1f} MB tepe")
+    for eps in [0.01, 0.002]:
+        # bölümler sırayla işlenir, sonuçlar saklanmadan karşılaştırılır
+        def approx():
+            merged, offsets = merge_rfm_sketches([rfm_sketches(part, eps) for part in partitions])
+            matches = 0
+            for part, offset in zip(partitions, offsets):
+                scored = rfm_scores_approx(part, merged, offset)
+                expected = exact["segment"].reindex(scored.index)
+                matches += (scored["segment"].cat.codes.to_numpy() == expected.cat.codes.to_numpy()).sum()
+            return merged, matches
+
+        approx_time, approx_peak, (merged, matches) = peak_memory(approx)
+        sketch_kb = sum(merged[col].size for col in ["recency", "monetary"]) * 8 / 2 ** 10
+        print(f"  {f'KLL eps={eps}':<40} {approx_time:10.3f} s {approx_peak / 2 ** 20:10.1f} MB tepe "
+              f"(özet {sketch_kb:.1f} KB, segment uyumu %{100 * matches / len(exact):.2f})")
+
+    # sabit seed: aynı girdi her seferinde aynı sınırları verir; boş özet açık bir ValueError yükseltir
+    edges = [rfm_sketches(rfm)["monetary"].quantile(np.linspace(0, 1, 6)) for _ in range(2)]
+    assert (edges[0] == edges[1]).all()
+    try:
+        rfm_sketches(rfm.iloc[:0])["recency"].quantile(0.5)
+        raise AssertionError("boş özet ValueError yükseltmedi")
+    except ValueError:
+        pass
+
+
+###############################################################
+# RFM Çıktısı: to_csv vs. kompakt Feather
+###############################################################
+
+def bench_rfm_layout(n_rows):
+    # burada n_rows müşteri sayısıdır
+    rfm = rfm_scores(make_rfm_table(n_rows), keep_scores=True)
+    baseline = rfm.astype({col: "int64" for col in ["recency_score", "frequency_score", "monetary_score"]})
+    baseline["segment"] = baseline["segment"].astype(object)
+    workdir = tempfile.mkdtemp()
+    csv_path, feather_path = os.path.join(workdir, "rfm.csv"), os.path.join(workdir, "rfm.feather")
+
+    csv_write, _ = timeit(baseline.to_csv, csv_path)
+    csv_read, from_csv = timeit(pd.read_csv, csv_path, index_col="Customer ID")
+    compact_write, _ = timeit(write_rfm, rfm, feather_path)
+    compact_read, from_feather = timeit(read_rfm, feather_path)
+    assert (from_feather["segment"].astype(str).to_numpy() == from_csv["segment"].to_numpy()).all()
+    # gidiş-dönüş tipleri korunur (Customer ID int32 dahil)
+    assert from_feather.index.dtype == np.int32
+    np.testing.assert_array_equal(from_feather.index, rfm.index)
+    assert (from_feather[["recency_score", "frequency_score", "monetary_score"]].dtypes == np.uint8).all()
+
+    def megabytes(frame):
+        return (frame.memory_usage(deep=True).sum()) / 2 ** 20
+
+    print(f"\nrfm_layout ({n_rows:,} müşteri)")
+    print(f"  {'':<24} {'bellek MB':>10} {'disk MB':>10} {'yazma s':>10} {'okuma s':>10}")
+    print(f"  {'to_csv / read_csv':<24} {megabytes(from_csv):10.1f} {os.path.getsize(csv_path) / 2 ** 20:10.1f} "
+          f"{csv_write:10.3f} {csv_read:10.3f}")
+    print(f"  {'write_rfm / read_rfm':<24} {megabytes(from_feather):10.1f} "
+          f"{os.path.getsize(feather_path) / 2 ** 20:10.1f} {compact_write:10.3f} {compact_read:10.3f}")
+
+
+###############################################################
+# RFM Servisi: yük testi (p50 / p99 gecikme ve işlem hacmi)
+###############################################################
+
+def latency_report(label, latencies, seconds):
+    latencies = np.asarray(latencies) * 1e6
+    print(f"  {label:<40} p50 {np.percentile(latencies, 50):8.1f} µs  p99 {np.percentile(latencies, 99):8.1f} µs  "
+          f"{len(latencies) / seconds:10,.0f} sorgu/s")
+
+
+async def _load_test(index, n_clients, n_requests, customer_ids, segments):
+    socket_path = os.path.join(tempfile.mkdtemp(), "rfm.sock")
+    server = await start_server(index, unix_path=socket_path)
+    rng = np.random.default_rng(0)
+
+    async def client(seed):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        local = np.random.default_rng(seed)
+        latencies = []
+        for i in range(n_requests):
+            customer = customer_ids[local.integers(len(customer_ids))]
+            query = f"GET {customer}\n" if i % 2 == 0 else f"IN {segments[i % len(segments)]} {customer}\n"
+            start = time.perf_counter()
+            writer.write(query.encode())
+            await reader.readline()
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+        return latencies
+
+    async with server:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[client(int(seed)) for seed in rng.integers(1 << 30, size=n_clients)])
+        seconds = time.perf_counter() - start
+    return [latency for latencies in results for latency in latencies], seconds
+
+
+def bench_rfm_service(n_rows, n_clients=16, n_requests=5_000):
+    # burada n_rows müşteri sayısıdır
+    rfm = rfm_scores(make_rfm_table(n_rows))
+    build_time, index = timeit(RFMIndex, rfm)
+    customer_ids = np.asarray(rfm.index)
+    segments = index.segments
+    print(f"\nrfm_service ({n_rows:,} müşteri, indeks {build_time:.2f} s)")
+
+    sample = customer_ids[np.random.default_rng(1).integers(len(customer_ids), size=200_000)]
+    latencies = []
+    start = time.perf_counter()
+    for customer in sample.tolist():
+        t0 = time.perf_counter()
+        index.get(customer)
+        latencies.append(time.perf_counter() - t0)
+    latency_report("süreç içi RFMIndex.get", latencies, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for customer in sample[:2_000].tolist():
+        rfm[rfm.index == customer]
+    filter_seconds = time.perf_counter() - start
+    print(f"  {'pandas filtre (rfm[rfm.index == id])':<40} ort. {filter_seconds / 2_000 * 1e6:8.1f} µs")
+
+    latencies, seconds = asyncio.run(_load_test(index, n_clients, n_requests, customer_ids, segments))
+    latency_report(f"Unix soketi, {n_clients} istemci", latencies, seconds)
+
+
+###############################################################
+# CLTV: lambda'lı agg + formüller vs. tek geçişli cltv_c_fused
+###############################################################
+
+def legacy_cltv_c(dataframe, profit=0.10):
+    cltv_c = dataframe.groupby('Customer ID').agg({'Invoice': lambda x: x.nunique(),
+                                                   'Quantity': lambda x: x.sum(),
+                                                   'TotalPrice': lambda x: x.sum()})
+    cltv_c.columns = ['total_transaction', 'total_unit', 'total_price']
+    return cltv_c_metrics(cltv_c, profit)
+
+
+def bench_cltv_fused(n_rows):
+    df = clean_online_retail(make_online_retail(n_rows))
+    df = df[df["Quantity"] > 0]
+    legacy_time, legacy_peak, legacy = peak_memory(legacy_cltv_c, df)
+    fused_time, fused_peak, fused = peak_memory(cltv_c_fused, df)
+    # toplamlar farklı sırada toplandığı için total_price son basamaklarda değişebilir
+    pd.testing.assert_frame_equal(legacy, fused, check_exact=False, rtol=1e-12)
+    assert (legacy["segment"] == fused["segment"]).all()
+    # boş girdi: aynı sütun ve tiplerle boş tablo
+    pd.testing.assert_frame_equal(cltv_c_fused(df.iloc[:0]), fused.iloc[:0])
+    report(f"create_cltv_c ({n_rows:,} satır, {len(fused):,} müşteri)",
+           [("groupby.agg + lambda + cltv_c_metrics", legacy_time),
+            ("cltv_c_fused", fused_time)])
+    print(f"  hızlanma: {legacy_time / fused_time:.1f}x, "
+          f"bellek tepe: {legacy_peak / 2 ** 20:,.0f} MB -> {fused_peak / 2 ** 20:,.0f} MB")
+
+
+###############################################################
+# CLTV Senaryoları: her kâr oranı için create_cltv_c vs. cltv_c_scenarios
+###############################################################
+
+def current_create_cltv_c(dataframe, profit):
+    # 04_1_cltv.py'deki create_cltv_c: her çağrıda temizleme + cltv_c_fused
+    dataframe = dataframe[~dataframe["Invoice"].str.contains("C", na=False)]
+    dataframe = dataframe[(dataframe['Quantity'] > 0)].dropna()
+    dataframe["TotalPrice"] = dataframe["Quantity"] * dataframe["Price"]
+    return cltv_c_fused(dataframe, profit)
+
+
+def bench_cltv_scenarios(n_rows, n_profits=40, n_churn_rates=25, n_calls=3):
+    # create_cltv_c churn_rate değiştirmeye izin vermez; karşılaştırma her senaryo için
+    # bir çağrı yapıldığı varsayımıyla birkaç çağrının süresinden tahmin edilir
+    raw = make_online_retail(n_rows)
+    profits = np.linspace(0.01, 0.40, n_profits)
+    churn_rates = np.linspace(0.05, 0.95, n_churn_rates)
+    scenarios = n_profits * n_churn_rates
+
+    calls_time, calls = timeit(lambda: [current_create_cltv_c(raw, profit) for profit in profits[:n_calls]])
+    per_call = calls_time / n_calls
+
+    aggregate_time, cltv_c = timeit(current_create_cltv_c, raw, 0.10)
+    sweep_time, peak, cube = peak_memory(cltv_c_scenarios, cltv_c, profits, churn_rates)
+
+    # veriden hesaplanan churn_rate ile create_cltv_c çıktısı birebir tekrar üretilir
+    check = cltv_c_scenarios(cltv_c, profits[:n_calls]).droplevel('churn_rate')
+    for profit, expected in zip(profits[:n_calls], calls):
+        got = check.xs(profit, level='profit')
+        np.testing.assert_array_equal(got['cltv'], expected['cltv'])
+        assert (got['segment'] == expected['segment']).all()
+    # sıfır ya da negatif kâr / churn oranında ortak segment varsayımı bozulur
+    for bad_profits, bad_churn_rates in [([0.1, 0.0], None), ([-0.1], None), ([0.1], [0.5, 0.0])]:
+        try:
+            cltv_c_scenarios(cltv_c, bad_profits, bad_churn_rates)
+            raise AssertionError("pozitif olmayan senaryo kabul edildi")
+        except ValueError:
+            pass
+
+    report(f"CLTV senaryoları ({n_rows:,} satır, {len(cltv_c):,} müşteri, {scenarios:,} senaryo)",
+           [(f"create_cltv_c x {scenarios:,} (tahmini)", per_call * scenarios),
+            ("create_cltv_c x 1 + cltv_c_scenarios", aggregate_time + sweep_time),
+            ("  yalnızca cltv_c_scenarios", sweep_time)])
+    print(f"  create_cltv_c çağrı başına: {per_call:.2f} s, küp: {len(cube):,} satır, "
+          f"bellek tepe: {peak / 2 ** 20:,.0f} MB")
+
+
+###############################################################
+# Bölümlenmiş Parquet: tüm tabloyu okuyup CLTV vs. partitioned_cltv_c
+###############################################################
+
+def bench_partitioned_cltv(n_rows, max_workers=None):
+    import pyarrow.parquet as pq
+
+    root = tempfile.mkdtemp(prefix="cltv_partitions_")
+    try:
+        write_partitioned_transactions(make_online_retail(n_rows), root)
+        n_partitions = len(os.listdir(root))
+
+        def in_memory():
+            dataframe = pq.read_table(root, columns=["Customer ID", "Invoice", "Quantity", "TotalPrice"]).to_pandas()
+            return cltv_c_fused(dataframe)
+
+        memory_time, memory_peak, expected = peak_memory(in_memory)
+        partitioned_time, partitioned_peak, result = peak_memory(partitioned_cltv_c, root, max_workers=max_workers)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    pd.testing.assert_frame_equal(expected, result, check_exact=False, rtol=1e-12)
+    assert (expected["segment"] == result["segment"]).all()
+    report(f"Bölümlenmiş CLTV ({n_rows:,} satır, {n_partitions} ay, {len(result):,} müşteri)",
+           [("tek DataFrame + cltv_c_fused", memory_time),
+            ("partitioned_cltv_c", partitioned_time)])
+    # işçiler bir seferde tek bir ayı okur; ana süreçte yalnızca müşteri toplamları tutulur
+    print(f"  ana süreç bellek tepe: {memory_peak / 2 ** 20:,.0f} MB -> {partitioned_peak / 2 ** 20:,.1f} MB")
+
+
+###############################################################
+# Temizleme: filtre zinciri vs. tek maskeli clean_transactions
+###############################################################
+
+def legacy_cleaning(dataframe):
+    # create_cltv_p'deki zincir; her adım filtrelenmiş bir kopya üretir
+    # (dropna(inplace=True) ham tabloyu değiştirmesin diye dropna() kullanılır)
+    dataframe = dataframe.dropna()
+    dataframe = dataframe[~dataframe["Invoice"].str.contains("C", na=False)]
+    dataframe = dataframe[dataframe["Quantity"] > 0]
+    dataframe = dataframe[dataframe["Price"] > 0]
+    dataframe["TotalPrice"] = dataframe["Quantity"] * dataframe["Price"]
+    return dataframe
+
+
+def bench_cleaning(n_rows):
+    raw = make_online_retail(n_rows)
+    legacy_time, legacy_peak, legacy = rss_high_water(legacy_cleaning, raw)
+    del legacy
+    engine_time, engine_peak, engine = rss_high_water(clean_transactions, raw, positive_price=True)
+    pd.testing.assert_frame_equal(legacy_cleaning(raw), engine)
+    report(f"Temizleme ({n_rows:,} satır -> {len(engine):,} satır)",
+           [("dropna + str.contains + filtre zinciri", legacy_time),
+            ("clean_transactions (tek maske)", engine_time)])
+    print(f"  RSS tepe artışı: {legacy_peak / 2 ** 20:,.0f} MB -> "
+          f"{engine_peak / 2 ** 20:,.0f} MB, ham tablo: {raw.memory_usage(deep=True).sum() / 2 ** 20:,.0f} MB")
+
+
+###############################################################
+# Aykırı Değer Baskılama: replace_with_thresholds vs. ThresholdCapper
+###############################################################
+
+def legacy_replace_with_thresholds(dataframe, variable):
+    # 04_2_cltv_prediction.py'deki outlier_thresholds + replace_with_thresholds
+    quartile1 = dataframe[variable].quantile(0.01)
+    quartile3 = dataframe[variable].quantile(0.99)
+    interquantile_range = quartile3 - quartile1
+    up_limit = quartile3 + 1.5 * interquantile_range
+    dataframe.loc[(dataframe[variable] > up_limit), variable] = up_limit
+
+
+def bench_threshold_capping(n_rows, chunksize=1_000_000):
+    # Quantity float'a çevrilir: pandas 3'te .loc ile int64 sütuna float sınır atanamaz
+    df = clean_transactions(make_online_retail(n_rows), positive_price=True).astype({"Quantity": "float64"})
+    columns = ["Quantity", "Price"]
+
+    def legacy(capped):
+        for col in columns:
+            legacy_replace_with_thresholds(capped, col)
+        return capped
+
+    def streamed():
+        capper = ThresholdCapper(columns)
+        for start in range(0, len(df), chunksize):
+            capper.partial_fit(df.iloc[start:start + chunksize])
+        return capper
+
+    legacy_time, legacy_peak, expected = peak_memory(legacy, df.copy())
+    capper = ThresholdCapper(columns)
+    vectorized_time, vectorized_peak, capped = peak_memory(capper.fit_transform, df.copy())
+    pd.testing.assert_frame_equal(expected, capped)
+    # varsayılan: çağıranın tablosu yerinde değişir; copy=True girdiye dokunmaz
+    inplace = df.copy()
+    assert capper.transform(inplace) is inplace
+    pd.testing.assert_frame_equal(expected, inplace)
+    original = df.copy()
+    pd.testing.assert_frame_equal(expected, capper.transform(df, copy=True))
+    pd.testing.assert_frame_equal(original, df)
+    del inplace, original
+    # tamsayı sütun, baskılanan değer olmasa da float64 olur
+    small = pd.DataFrame({"Quantity": np.arange(100, dtype=np.int64)})
+    assert ThresholdCapper(["Quantity"]).fit_transform(small)["Quantity"].dtype == np.float64
+    # ilk yarıda öğrenilen sınırların ikinci yarının parçalarına uygulanması
+    half = len(df) // 2
+    period = ThresholdCapper(columns).fit(df.iloc[:half])
+    transform_time, _ = timeit(lambda: [period.transform(df.iloc[start:start + chunksize], copy=True)
+                                        for start in range(half, len(df), chunksize)])
+    stream_time, stream = timeit(streamed)
+    report(f"Aykırı değer baskılama ({len(df):,} satır, {len(columns)} sütun)",
+           [("replace_with_thresholds (sütun sütun)", legacy_time),
+            ("ThresholdCapper.fit_transform", vectorized_time),
+            ("transform (öğrenilmiş sınırlar)", transform_time),
+            ("partial_fit (KLL, parçalar)", stream_time)])
+    print(f"  tepe bellek: {legacy_peak / 2 ** 20:,.0f} MB -> {vectorized_peak / 2 ** 20:,.0f} MB")
+    print(f"  sınırlar: {capper.caps}, partial_fit: {stream.caps}")
+
+
+###############################################################
+# Farklı Fatura Sayısı: metin nunique vs. tamsayı kodlar + sıralama
+###############################################################
+
+def bench_invoice_codes(n_rows):
+    df = clean_transactions(make_online_retail(n_rows))
+    nunique_time, nunique_peak, expected = peak_memory(lambda: df.groupby("Customer ID")["Invoice"].nunique())
+    encode_time, encode_peak, codes = peak_memory(encode_invoices, df["Invoice"])
+    count_time, count_peak, counts = peak_memory(distinct_invoice_counts, df["Customer ID"], codes)
+    pd.testing.assert_series_equal(expected, counts, check_names=False)
+    # tamsayı olmayan, 2^26'dan büyük ve metin Customer ID'ler de nunique ile aynı sayılır
+    for ids in [df["Customer ID"] + 0.5, df["Customer ID"] + 2.0 ** 40,
+                "C" + df["Customer ID"].astype("int64").astype(str)]:
+        pd.testing.assert_series_equal(df.groupby(ids)["Invoice"].nunique(), distinct_invoice_counts(ids, codes),
+                                       check_names=False, check_index_type=False)
+
+    # akış okuyucuda saklanan (Customer ID, Invoice) çiftleri
+    pairs = df[["Customer ID", "Invoice"]].drop_duplicates()
+    keys = np.unique(pack_invoice_pairs(pd.factorize(df["Customer ID"])[0], codes))
+    report(f"Farklı fatura sayısı ({n_rows:,} satır, {len(counts):,} müşteri, {len(keys):,} çift)",
+           [("groupby + nunique (metin)", nunique_time),
+            ("encode_invoices (bir kez)", encode_time),
+            ("distinct_invoice_counts (sıralama)", count_time),
+            ("  toplam", encode_time + count_time)])
+    print(f"  bellek tepe: nunique {nunique_peak / 2 ** 20:,.0f} MB, encode {encode_peak / 2 ** 20:,.0f} MB, "
+          f"sayım {count_peak / 2 ** 20:,.0f} MB")
+    print(f"  çift tablosu: {pairs.memory_usage(deep=True).sum() / 2 ** 20:,.1f} MB -> "
+          f"int64 anahtarlar {keys.nbytes / 2 ** 20:,.1f} MB")
+
+
+###############################################################
+# Segment Kayması: önceki ayı ham veriden yeniden hesaplama vs. kayıtlı taban
+###############################################################
+
+def bench_cltv_drift(n_rows):
+    df = clean_transactions(make_online_retail(n_rows))
+    previous = df[df["InvoiceDate"] < "2011-11-01"]
+    store = tempfile.mkdtemp(prefix="cltv_drift_")
+    try:
+        cltv_drift_report(cltv_c_fused(previous), "2011-10", store)
+        current = cltv_c_fused(df)
+
+        def manual():
+            # önceki ayın ham verisinden tabloyu yeniden kurup segment özetlerini karşılaştırmak
+            baseline = cltv_c_fused(previous)
+            return (current.groupby("segment", observed=False)["cltv"].agg(["count", "mean", "sum"])
+                    - baseline.groupby("segment", observed=False)["cltv"].agg(["count", "mean", "sum"]))
+
+        manual_time, _ = timeit(manual)
+        drift_time, drift = timeit(cltv_drift_report, current, "2011-11", store)
+        # aynı run tekrar çalıştırılınca kendisiyle değil önceki kayıtla karşılaştırılır
+        assert cltv_drift_report(current, "2011-11", store)["baseline_run"] == "2011-10"
+        store_size = sum(entry.stat().st_size for entry in os.scandir(store) if entry.name.endswith(".pkl")) / 2
+    finally:
+        shutil.rmtree(store, ignore_errors=True)
+
+    report(f"CLTV segment kayması ({n_rows:,} satır, {len(current):,} müşteri)",
+           [("önceki ay yeniden hesaplanır + groupby", manual_time),
+            ("cltv_drift_report (kayıtlı taban)", drift_time)])
+    print(f"  kayıt başına {store_size / 2 ** 10:,.0f} KB, psi: {drift['psi']:.3f}, "
+          f"yeni müşteri: {drift['new']:,}, segment değiştiren: "
+          f"{drift['migration'].to_numpy().sum() - np.trace(drift['migration'].to_numpy()):,}")
+
+
+###############################################################
+# Tembel CLTV: cltv_c_metrics vs. LazyCLTV (gereksiz ara sütunlar atılır)
+###############################################################
+
+def make_customer_table(n_customers, seed=42):
+    rng = np.random.default_rng(seed)
+    total_transaction = rng.geometric(0.3, n_customers)
+    total_unit = total_transaction * rng.integers(1, 200, n_customers)
+    return pd.DataFrame({"total_transaction": total_transaction,
+                         "total_unit": total_unit,
+                         "total_price": total_unit * rng.gamma(2.0, 2.0, n_customers).round(2)},
+                        index=pd.Index(np.arange(n_customers, dtype=np.float64), name="Customer ID"))
+
+
+def bench_lazy_cltv(n_rows):
+    # n_rows burada müşteri sayısıdır
+    cltv_c = make_customer_table(n_rows)
+    eager_time, eager_peak, eager = peak_memory(cltv_c_metrics, cltv_c)
+    rows = [("cltv_c_metrics (tüm sütunlar)", eager_time, eager_peak)]
+    for columns in [None, ("cltv", "segment"), ("cltv",)]:
+        lazy = LazyCLTV(cltv_c) if columns is None else LazyCLTV(cltv_c).select(*columns)
+        lazy_time, lazy_peak, result = peak_memory(lazy.collect)
+        pd.testing.assert_frame_equal(eager[result.columns], result, check_exact=True)
+        label = "tüm sütunlar" if columns is None else ", ".join(columns)
+        rows.append((f"LazyCLTV ({label})", lazy_time, lazy_peak))
+    print(LazyCLTV(cltv_c).select("cltv", "segment").explain())
+    print(f"\nTembel CLTV ({n_rows:,} müşteri)")
+    for label, seconds, peak in rows:
+        print(f"  {label:<40} {seconds:10.3f} s {peak / 2 ** 20:10.0f} MB tepe")
+
+
+###############################################################
+# CLTV Dışa Aktarımı: to_csv / read_csv vs. write_cltv / read_cltv
+###############################################################
+
+def bench_cltv_export(n_rows):
+    # n_rows burada müşteri sayısıdır
+    cltv_c = cltv_c_metrics(make_customer_table(n_rows))
+    workdir = tempfile.mkdtemp(prefix="cltv_export_")
+    csv_path = os.path.join(workdir, "cltv_c.csv")
+    parquet_path = os.path.join(workdir, "cltv_c.parquet")
+    try:
+        csv_write, _ = timeit(cltv_c.to_csv, csv_path)
+        csv_read, from_csv = timeit(pd.read_csv, csv_path, index_col="Customer ID")
+        parquet_write, _ = timeit(write_cltv, cltv_c, parquet_path, profit=0.10)
+        parquet_read, from_parquet = timeit(read_cltv, parquet_path)
+        segment_read, segment_a = timeit(read_cltv, parquet_path, segments=["A"])
+        sizes = os.path.getsize(csv_path), os.path.getsize(parquet_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    pd.testing.assert_frame_equal(from_parquet.sort_index(), cltv_c)
+    assert len(segment_a) == (cltv_c["segment"] == "A").sum()
+    report(f"CLTV dışa aktarımı ({n_rows:,} müşteri)",
+           [("to_csv", csv_write),
+            ("read_csv", csv_read),
+            ("write_cltv (parquet, zstd)", parquet_write),
+            ("read_cltv (memory-map)", parquet_read),
+            ("read_cltv(segments=['A'])", segment_read)])
+    print(f"  dosya boyutu: csv {sizes[0] / 2 ** 20:,.0f} MB, parquet {sizes[1] / 2 ** 20:,.0f} MB; "
+          f"read_csv segmenti kategorik değil, metin olarak okur")
+
+
+###############################################################
+# BG-NBD: ufuk başına bgf.predict vs. bgnbd_expected_purchases
+###############################################################
+
+BGNBD_PARAMS = {"r": 0.24, "alpha": 4.41, "a": 0.79, "b": 2.43}
+
+
+def make_lifetimes_summary(n_customers, params=BGNBD_PARAMS, seed=42):
+    # BG-NBD sürecinden haftalık (frequency, recency, T); süreler create_cltv_p'deki gibi gün / 7
+    rng = np.random.default_rng(seed)
+    T_days = rng.integers(1, 740, n_customers)
+    rate = rng.gamma(params["r"], 1 / params["alpha"], n_customers) / 7
+    dropout = rng.beta(params["a"], params["b"], n_customers)
+    events = rng.poisson(rate * T_days)
+    frequency = np.minimum(events, rng.geometric(dropout) - 1)
+    recency_days = np.floor(rng.beta(np.maximum(frequency, 1), np.maximum(events - frequency, 0) + 1) * T_days)
+    recency_days[frequency == 0] = 0
+    return pd.DataFrame({"frequency": frequency.astype(np.float64),
+                         "recency": recency_days / 7,
+                         "T": T_days / 7},
+                        index=pd.Index(np.arange(n_customers), name="Customer ID"))
+
+
+def bench_bgnbd_horizons(n_rows, n_grid=26):
+    # n_rows burada müşteri sayısıdır
+    import warnings
+    from lifetimes import BetaGeoFitter
+
+    summary = make_lifetimes_summary(n_rows)
+    bgf = BetaGeoFitter(penalizer_coef=0.001)
+    bgf.params_ = pd.Series(BGNBD_PARAMS)
+    # bgf.predict, fit sırasında bu metoda bağlanır
+    predict = bgf.conditional_expected_number_of_purchases_up_to_time
+    args = summary["frequency"], summary["recency"], summary["T"]
+
+    rows = []
+    for label, horizons in [("create_cltv_p: 1, 4, 12 hafta", [1, 4, 12]),
+                            (f"{n_grid} ufuk (2..52 hafta)", list(range(2, 2 * n_grid + 1, 2)))]:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            loop_time, loop = timeit(lambda: {h: predict(h, *args) for h in horizons})
+            matrix_time, matrix = timeit(bgnbd_expected_purchases, bgf.params_, horizons, *args)
+        error = max(np.max(np.abs(matrix[h].to_numpy() - loop[h].to_numpy())) for h in horizons)
+        rows += [(f"{label}: bgf.predict döngüsü", loop_time), (f"{label}: tek çağrı", matrix_time)]
+        print(f"  {label}: en büyük fark {error:.2e}")
+    report(f"BG-NBD çok ufuklu tahmin ({n_rows:,} müşteri)", rows)
+
+
+###############################################################
+# BG-NBD Kurulumu: BetaGeoFitter vs. fit_bgnbd (örüntü sıkıştırma + analitik gradyan)
+###############################################################
+
+def bench_bgnbd_fit(n_rows, sizes=(100_000, 1_000_000, 10_000_000), lifetimes_limit=1_000_000):
+    # n_rows en büyük müşteri sayısını sınırlar; lifetimes müşteri bazında yalnızca lifetimes_limit'e
+    # kadar çalıştırılır (10M müşteride autograd bellek ve süresi bu makineye sığmaz)
+    import warnings
+    from lifetimes import BetaGeoFitter
+
+    for n_customers in [size for size in sizes if size <= n_rows]:
+        summary = make_lifetimes_summary(n_customers)
+        args = summary["frequency"], summary["recency"], summary["T"]
+        rows = []
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            if n_customers <= lifetimes_limit:
+                lifetimes_time, bgf = timeit(BetaGeoFitter(penalizer_coef=0.001).fit, *args)
+                rows.append(("BetaGeoFitter (müşteri bazında)", lifetimes_time))
+            pattern_time, (patterns, _) = timeit(bgnbd_patterns, *args)
+            weighted_time, weighted = timeit(BetaGeoFitter(penalizer_coef=0.001).fit, patterns["frequency"],
+                                             patterns["recency"], patterns["T"], weights=patterns["weights"])
+            rows.append(("BetaGeoFitter (örüntü ağırlıklı)", pattern_time + weighted_time))
+            native_time, params = timeit(fit_bgnbd, *args, penalizer_coef=0.001)
+            rows.append(("fit_bgnbd", native_time))
+        reference = bgf.params_ if n_customers <= lifetimes_limit else weighted.params_
+        error = np.max(np.abs(params / reference - 1))
+        report(f"BG-NBD kurulumu ({n_customers:,} müşteri, {len(patterns):,} örüntü)", rows)
+        print(f"  parametreler: {params.round(4).to_dict()}, en büyük göreli fark: {error:.1e}")
+
+
+GAMMA_GAMMA_PARAMS = {"p": 6.25, "q": 3.74, "v": 15.44}
+
+
+def make_repeat_customers(n_customers, params=GAMMA_GAMMA_PARAMS, seed=42):
+    # make_lifetimes_summary'deki tekrar eden müşteriler ve Gamma-Gamma sürecinden işlem başına ortalama tutar
+    summary = make_lifetimes_summary(n_customers, seed=seed)
+    summary = summary[summary["frequency"] > 0]
+    rng = np.random.default_rng(seed)
+    x = summary["frequency"].to_numpy()
+    nu = rng.gamma(params["q"], 1 / params["v"], len(x))
+    summary["monetary_value"] = rng.gamma(params["p"] * x, 1 / (nu * x))
+    return summary
+
+
+def bench_gamma_gamma(n_rows, sizes=(100_000, 1_000_000, 10_000_000), lifetimes_limit=1_000_000):
+    # n_rows en büyük müşteri sayısını sınırlar; kesin mod ve gruplu mod (decimals=2, 0) lifetimes ile karşılaştırılır
+    import warnings
+    from lifetimes import GammaGammaFitter
+
+    for n_customers in [size for size in sizes if size <= n_rows]:
+        summary = make_repeat_customers(n_customers)
+        args = summary["frequency"], summary["monetary_value"]
+        rows, fits, n_patterns = [], {}, {}
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            if n_customers <= lifetimes_limit:
+                lifetimes_time, ggf = timeit(GammaGammaFitter(penalizer_coef=0.01).fit, *args)
+                rows.append(("GammaGammaFitter", lifetimes_time))
+                profit_time, reference_profit = timeit(ggf.conditional_expected_average_profit, *args)
+                rows.append(("conditional_expected_average_profit", profit_time))
+            for decimals in (None, 2, 0):
+                label = "kesin" if decimals is None else f"decimals={decimals}"
+                n_patterns[label] = len(gamma_gamma_patterns(*args, decimals=decimals)[0])
+                fit_time, fits[label] = timeit(fit_gamma_gamma, *args, penalizer_coef=0.01, decimals=decimals)
+                rows.append((f"fit_gamma_gamma ({label})", fit_time))
+        profit_time, profit = timeit(gamma_gamma_expected_profit, fits["kesin"], *args)
+        rows.append(("gamma_gamma_expected_profit", profit_time))
+        report(f"Gamma-Gamma kurulumu ({len(summary):,} tekrar eden müşteri)", rows)
+        reference = ggf.params_ if n_customers <= lifetimes_limit else fits["kesin"]
+        if n_customers > lifetimes_limit:
+            reference_profit = profit
+            print("  lifetimes çalıştırılmadı; farklar kesin moda göre")
+        for label, params in fits.items():
+            expected = gamma_gamma_expected_profit(params, *args)
+            print(f"  {label} ({n_patterns[label]:,} örüntü): parametreler {params.round(4).to_dict()}, en büyük göreli fark "
+                  f"{np.max(np.abs(params / reference - 1)):.1e}, beklenen kârda "
+                  f"{np.max(np.abs(expected / reference_profit - 1)):.1e}")
+
+
+###############################################################
+# İndirgenmiş CLTV: ggf.customer_lifetime_value döngüsü vs. customer_lifetime_value
+###############################################################
+
+def bench_discounted_clv(n_rows, months=(3, 6, 12, 24, 36, 60), sizes=(100_000, 1_000_000, 10_000_000),
+                         lifetimes_limit=1_000_000):
+    # n_rows en büyük müşteri sayısını sınırlar; lifetimes her ufuk için ayrı çağrılır (create_cltv_p'deki gibi)
+    import warnings
+    from lifetimes import BetaGeoFitter, GammaGammaFitter
+
+    bgf = BetaGeoFitter(penalizer_coef=0.001)
+    bgf.params_ = pd.Series(BGNBD_PARAMS)
+    # ggf.customer_lifetime_value bgf.predict'i çağırır; predict fit sırasında bu metoda bağlanır
+    bgf.predict = bgf.conditional_expected_number_of_purchases_up_to_time
+    ggf = GammaGammaFitter(penalizer_coef=0.01)
+    ggf.params_ = pd.Series(GAMMA_GAMMA_PARAMS)
+
+    for n_customers in [size for size in sizes if size <= n_rows]:
+        summary = make_repeat_customers(n_customers)
+        args = summary["frequency"], summary["recency"], summary["T"]
+        profit = gamma_gamma_expected_profit(ggf.params_, summary["frequency"], summary["monetary_value"])
+        rows = []
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            if n_customers <= lifetimes_limit:
+                loop = {}
+                for month in months:
+                    loop_time, loop[month] = timeit(ggf.customer_lifetime_value, bgf, *args, summary["monetary_value"],
+                                                    time=month, freq="W", discount_rate=0.01)
+                    rows.append((f"ggf.customer_lifetime_value ({month} ay)", loop_time))
+            for month in (months[0], months[-1]):
+                single_time, _ = timeit(customer_lifetime_value, bgf.params_, month, *args, profit)
+                rows.append((f"customer_lifetime_value ({month} ay)", single_time))
+            matrix_time, clv = timeit(customer_lifetime_value, bgf.params_, list(months), *args, profit)
+            rows.append((f"customer_lifetime_value ({len(months)} ufuk)", matrix_time))
+        report(f"İndirgenmiş CLTV ({len(summary):,} tekrar eden müşteri)", rows)
+        if n_customers <= lifetimes_limit:
+            error = max(np.max(np.abs(clv[month] / loop[month] - 1)) for month in months)
+            print(f"  lifetimes'a göre en büyük göreli fark: {error:.1e}")
+
+
+###############################################################
+# Bootstrap CLTV Aralıkları: satır kopyalayan lifetimes döngüsü vs. bootstrap_cltv
+###############################################################
+
+def bench_bootstrap_cltv(n_rows, n_customers=100_000, n_boot=100, workers=(1, 2, 4)):
+    # lifetimes ile tek bir örnek (satırlar kopyalanıp iki model sıfırdan kurulur) ölçülüp n_boot ile çarpılır
+    import warnings
+    from lifetimes import BetaGeoFitter, GammaGammaFitter
+
+    summary = make_repeat_customers(min(n_rows, n_customers))
+    args = summary["frequency"], summary["recency"], summary["T"], summary["monetary_value"]
+
+    def lifetimes_replicate():
+        sample = summary.sample(frac=1, replace=True, random_state=0)
+        bgf = BetaGeoFitter(penalizer_coef=0.001).fit(sample["frequency"], sample["recency"], sample["T"])
+        ggf = GammaGammaFitter(penalizer_coef=0.01).fit(sample["frequency"], sample["monetary_value"])
+        return bgf, ggf
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        replicate_time, _ = timeit(lifetimes_replicate)
+    rows = [(f"lifetimes, {n_boot} örnek (tahmini)", replicate_time * n_boot)]
+    for max_workers in workers:
+        bootstrap_time, result = timeit(bootstrap_cltv, *args, n_boot=n_boot, max_workers=max_workers, seed=0)
+        rows.append((f"bootstrap_cltv ({max_workers} işçi)", bootstrap_time))
+    report(f"Bootstrap CLTV aralıkları ({len(summary):,} müşteri, {n_boot} örnek, "
+           f"{os.cpu_count()} çekirdek)", rows)
+    print(result["segments"][["count", "mean", "mean_lower", "mean_upper"]].round(3))
+
+
+###############################################################
+# Lifetime Tablosu: dört lambda'lı groupby vs. tek sıralı geçiş (lifetimes_summary)
+###############################################################
+
+def legacy_lifetimes_summary(dataframe, today_date):
+    # create_cltv_p'deki cltv_df bloğu
+    cltv_df = dataframe.groupby("Customer ID").agg(
+        {"InvoiceDate": [lambda InvoiceDate: (InvoiceDate.max() - InvoiceDate.min()).days,
+                         lambda InvoiceDate: (today_date - InvoiceDate.min()).days],
+         "Invoice": lambda Invoice: Invoice.nunique(),
+         "TotalPrice": lambda TotalPrice: TotalPrice.sum()})
+    cltv_df.columns = cltv_df.columns.droplevel(0)
+    cltv_df.columns = ["recency", "T", "frequency", "monetary"]
+    cltv_df["monetary"] = cltv_df["monetary"] / cltv_df["frequency"]
+    cltv_df = cltv_df[(cltv_df["frequency"] > 1)]
+    cltv_df["recency"] = cltv_df["recency"] / 7
+    cltv_df["T"] = cltv_df["T"] / 7
+    return cltv_df
+
+
+def bench_lifetimes_summary(n_rows, legacy_rows=2_000_000, part_rows=2_500_000, chunksize=1_000_000):
+    # legacy_rows satırda groupby ile karşılaştırma; n_rows (ör. 50M) satırlık parquet dosyası
+    # part_rows'luk parçalarla yazılır ve parça parça okunarak özetlenir
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    today_date = dt.datetime(2011, 12, 11)
+    df = clean_transactions(make_online_retail(min(n_rows, legacy_rows)), positive_price=True)
+    legacy_time, expected = timeit(legacy_lifetimes_summary, df, today_date)
+    summary_time, summary = timeit(lifetimes_summary, df, today_date)
+    # pandas groupby sum Kahan toplaması kullanır; monetary son basamakta farklı olabilir
+    pd.testing.assert_frame_equal(expected, summary, check_exact=False, rtol=1e-12)
+    # metin Customer ID'ler, dört parça halinde (parçalar arasında ortak müşteri kodları)
+    labeled = df.assign(**{"Customer ID": "C" + df["Customer ID"].astype("int64").astype(str)})
+    step = len(labeled) // 4 + 1
+    pd.testing.assert_frame_equal(legacy_lifetimes_summary(labeled, today_date),
+                                  lifetimes_summary([labeled.iloc[start:start + step]
+                                                     for start in range(0, len(labeled), step)], today_date),
+                                  check_exact=False, rtol=1e-12)
+    del labeled
+    split_time, _ = timeit(lifetimes_summary, df, today_date, calibration_end=dt.datetime(2011, 6, 1))
+    report(f"Lifetime tablosu ({len(df):,} temiz satır, {len(summary):,} müşteri)",
+           [("groupby.agg (4 lambda) + / 7", legacy_time),
+            ("lifetimes_summary", summary_time),
+            ("lifetimes_summary (kalibrasyon/holdout)", split_time)])
+    del df
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "online_retail_II.parquet")
+    try:
+        writer = None
+        for part, start in enumerate(range(0, n_rows, part_rows)):
+            chunk = make_online_retail(min(part_rows, n_rows - start), n_customers=max(n_rows // 200, 1),
+                                       seed=part, invoice_offset=start // 20)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = writer or pq.ParquetWriter(path, table.schema)
+            writer.write_table(table, row_group_size=chunksize)
+            del chunk, table
+        writer.close()
+
+        def aggregates_path():
+            customers = stream_customer_aggregates(path, chunksize, positive_price=True)
+            return lifetimes_summary_from_aggregates(customers, today_date)
+
+        stream_time, stream_peak, streamed = rss_high_water(stream_lifetimes_summary, path, None, today_date, chunksize)
+        aggregates_time, aggregates_peak, expected = rss_high_water(aggregates_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    pd.testing.assert_frame_equal(expected, streamed, check_exact=False, rtol=1e-12, check_index_type=False)
+    report(f"Akış halinde lifetime tablosu ({n_rows:,} satır, {len(streamed):,} müşteri, {chunksize:,} satırlık parçalar)",
+           [("stream_customer_aggregates (önceki yol)", aggregates_time),
+            ("stream_lifetimes_summary (sıralı geçiş)", stream_time)])
+    print(f"  RSS tepe artışı: {aggregates_peak / 2 ** 20:,.0f} MB -> {stream_peak / 2 ** 20:,.0f} MB")
+
+
+BENCHMARKS = {
+    "rfm_metrics": bench_rfm_metrics,
+    "incremental_rfm": bench_incremental_rfm,
+    "streaming": bench_streaming,
+    "excel_cache": bench_excel_cache,
+    "rfm_segments": bench_rfm_segments,
+    "rfm_snapshots": bench_rfm_snapshots,
+    "partitioned_rfm": bench_partitioned_rfm,
+    "rfm_sketch": bench_rfm_sketch,
+    "rfm_layout": bench_rfm_layout,
+    "rfm_service": bench_rfm_service,
+    "cltv_fused": bench_cltv_fused,
+    "cltv_scenarios": bench_cltv_scenarios,
+    "partitioned_cltv": bench_partitioned_cltv,
+    "cleaning": bench_cleaning,
+    "threshold_capping": bench_threshold_capping,
+    "invoice_codes": bench_invoice_codes,
+    "cltv_drift": bench_cltv_drift,
+    "lazy_cltv": bench_lazy_cltv,
+    "cltv_export": bench_cltv_export,
+    "bgnbd_horizons": bench_bgnbd_horizons,
+    "bgnbd_fit": bench_bgnbd_fit,
+    "gamma_gamma": bench_gamma_gamma,
+    "discounted_clv": bench_discounted_clv,
+    "bootstrap_cltv": bench_bootstrap_cltv,
+    "lifetimes_summary": bench_lifetimes_summary,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("names", nargs="*", metavar="name", help=", ".join(BENCHMARKS))
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name](args.rows)
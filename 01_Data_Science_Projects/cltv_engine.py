@@ -0,0 +1,525 @@
+###############################################################
+# CLTV Motoru (CLTV Engine)
+###############################################################
+
+# 04_1_cltv.py içindeki create_cltv_c fonksiyonunun hesap adımları.
+# Müşteri tablosu (index: Customer ID) total_transaction, total_unit ve total_price sütunlarını içerir.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from quantile_sketch import sketch_qcut
+from retail_io import (clean_transactions, count_packed_pairs, customer_codes, distinct_invoice_counts,
+                       encode_invoices, pack_invoice_pairs, read_transactions, recode_invoice_pairs,
+                       stream_customer_aggregates, unique_pairs)
+
+
+###############################################################
+# CLTV Formülleri (CLTV Formulas)
+###############################################################
+
+def cltv_c_metrics(cltv_c, profit=0.10, segment_sketch=None):
+    # segment_sketch: cltv değerlerinin tüm bölümlerden birleştirilmiş KLLSketch'i; verilirse
+    # segmentler pd.qcut yerine bu özetin sınırlarıyla atanır
+    cltv_c = cltv_c.copy()
+    # avg_order_value
+    cltv_c['avg_order_value'] = cltv_c['total_price'] / cltv_c['total_transaction']
+    # purchase_frequency
+    cltv_c["purchase_frequency"] = cltv_c['total_transaction'] / cltv_c.shape[0]
+    # repeat rate & churn rate
+    repeat_rate = cltv_c[cltv_c.total_transaction > 1].shape[0] / cltv_c.shape[0]
+    churn_rate = 1 - repeat_rate
+    # profit_margin
+    cltv_c['profit_margin'] = cltv_c['total_price'] * profit
+    # Customer Value
+    cltv_c['customer_value'] = (cltv_c['avg_order_value'] * cltv_c["purchase_frequency"])
+    # Customer Lifetime Value
+    cltv_c['cltv'] = (cltv_c['customer_value'] / churn_rate) * cltv_c['profit_margin']
+    # Segment
+    if segment_sketch is None:
+        cltv_c["segment"] = pd.qcut(cltv_c["cltv"], 4, labels=["D", "C", "B", "A"])
+    else:
+        cltv_c["segment"] = sketch_qcut(cltv_c["cltv"], segment_sketch, labels=["D", "C", "B", "A"])
+    return cltv_c
+
+
+###############################################################
+# Tek Geçişte CLTV (Fused CLTV Kernel)
+###############################################################
+
+# create_cltv_c üç lambda'lı groupby ve ardından her formül için ayrı sütun geçişi yapar.
+# Burada müşteriler factorize edilir, faturalar tamsayı kodlara çevrilir, (müşteri, fatura) anahtarı bir kez sıralanır ve
+# müşteri segmentleri üzerinde np.add.reduceat ile toplamlar alınır. Formüller önceden ayrılmış
+# dizilere out= ile yazılır; işlem sırası create_cltv_c ile aynıdır.
+
+def cltv_c_fused(dataframe, profit=0.10):
+    customer_codes, customers = pd.factorize(dataframe['Customer ID'], sort=True)
+    n = len(customers)
+
+    key = pack_invoice_pairs(customer_codes, encode_invoices(dataframe['Invoice']))
+    order = np.argsort(key, kind='stable')
+    key = key[order]
+    sorted_customers = customer_codes[order]
+    if n:
+        starts = np.flatnonzero(np.r_[True, sorted_customers[1:] != sorted_customers[:-1]])
+        new_invoice = np.r_[True, key[1:] != key[:-1]]
+        total_transaction = np.add.reduceat(new_invoice.astype(np.int64), starts)
+        total_unit = np.add.reduceat(dataframe['Quantity'].to_numpy()[order], starts)
+        total_price = np.add.reduceat(dataframe['TotalPrice'].to_numpy(dtype=np.float64)[order], starts)
+    else:
+        # boş girdi: reduceat boş dizide çalışmaz, aynı sütunlarla boş tablo döner
+        total_transaction = np.empty(0, np.int64)
+        total_unit = dataframe['Quantity'].to_numpy()
+        total_price = dataframe['TotalPrice'].to_numpy(dtype=np.float64)
+
+    repeat_rate = np.count_nonzero(total_transaction > 1) / n if n else 0.0
+    churn_rate = 1 - repeat_rate
+
+    out = np.empty((5, n))
+    avg_order_value, purchase_frequency, profit_margin, customer_value, cltv = out
+    np.divide(total_price, total_transaction, out=avg_order_value)
+    np.divide(total_transaction, n, out=purchase_frequency)
+    np.multiply(total_price, profit, out=profit_margin)
+    np.multiply(avg_order_value, purchase_frequency, out=customer_value)
+    np.divide(customer_value, churn_rate, out=cltv)
+    np.multiply(cltv, profit_margin, out=cltv)
+
+    cltv_c = pd.DataFrame({'total_transaction': total_transaction,
+                           'total_unit': total_unit,
+                           'total_price': total_price,
+                           'avg_order_value': avg_order_value,
+                           'purchase_frequency': purchase_frequency,
+                           'profit_margin': profit_margin,
+                           'customer_value': customer_value,
+                           'cltv': cltv},
+                          index=pd.Index(customers, name='Customer ID'), copy=False)
+    if n:
+        cltv_c["segment"] = pd.qcut(cltv_c["cltv"], 4, labels=["D", "C", "B", "A"])
+    else:
+        cltv_c["segment"] = pd.Categorical([], categories=["D", "C", "B", "A"], ordered=True)
+    return cltv_c
+
+
+###############################################################
+# Senaryo Analizi (Profit & Churn Scenario Sweep)
+###############################################################
+
+# Her kâr oranı için create_cltv_c'yi yeniden çağırmak veriyi her seferinde temizleyip gruplar.
+# Müşteri toplamları bir kez hesaplanır; cltv = (customer_value / churn_rate) * (total_price * profit)
+# tüm (profit, churn_rate) ızgarası için tek bir yayınlama (broadcast) işlemiyle hesaplanır.
+# profit ve churn_rate pozitif olduğunda cltv pozitif bir sabitle ölçeklenir, sıralama ve dolayısıyla
+# pd.qcut segmentleri tüm senaryolarda aynıdır; segmentler bir kez atanıp tekrarlanır. Sıfır ya da
+# negatif değerler sıralamayı ters çevirir ya da bozar, bu yüzden kabul edilmez.
+
+def cltv_c_scenarios(cltv_c, profits, churn_rates=None):
+    # cltv_c: en az total_transaction ve total_price sütunları olan müşteri tablosu
+    # (create_cltv_c, cltv_c_fused ya da stream_cltv_c çıktısı).
+    # churn_rates verilmezse veriden hesaplanan churn_rate kullanılır.
+    # Dönen tablo: index (profit, churn_rate, Customer ID), sütunlar cltv ve segment.
+    total_transaction = cltv_c['total_transaction'].to_numpy(dtype=np.float64)
+    total_price = cltv_c['total_price'].to_numpy(dtype=np.float64)
+    n = len(cltv_c)
+    customer_value = (total_price / total_transaction) * (total_transaction / n)
+
+    if churn_rates is None:
+        churn_rates = [1 - np.count_nonzero(total_transaction > 1) / n]
+    profits = np.asarray(profits, dtype=np.float64)
+    churn_rates = np.asarray(churn_rates, dtype=np.float64)
+    # NaN da reddedilir
+    if not (profits > 0).all():
+        raise ValueError("profits değerleri sıfırdan büyük olmalı (segmentler tüm senaryolarda ortak)")
+    if not (churn_rates > 0).all():
+        raise ValueError("churn_rates değerleri sıfırdan büyük olmalı (segmentler tüm senaryolarda ortak)")
+
+    # (profit, churn_rate, müşteri) boyutlu küp
+    cltv = ((customer_value / churn_rates[:, None])[None, :, :]
+            * (total_price * profits[:, None])[:, None, :])
+
+    segment = pd.qcut(customer_value * total_price, 4, labels=["D", "C", "B", "A"])
+    scenarios = len(profits) * len(churn_rates)
+    index = pd.MultiIndex.from_product([profits, churn_rates, cltv_c.index],
+                                       names=['profit', 'churn_rate', cltv_c.index.name])
+    return pd.DataFrame({'cltv': cltv.ravel(),
+                         'segment': pd.Categorical.from_codes(np.tile(segment.codes, scenarios),
+                                                              dtype=segment.dtype)},
+                        index=index, copy=False)
+
+
+###############################################################
+# Parça Parça Okuyarak CLTV (Streaming CLTV)
+###############################################################
+
+def stream_cltv_c(path, profit=0.10, chunksize=1_000_000):
+    # .csv/.parquet kaynağını parça parça okuyup create_cltv_c ile aynı tabloyu üretir
+    customers = stream_customer_aggregates(path, chunksize)
+    return cltv_c_metrics(customers[['total_transaction', 'total_unit', 'total_price']], profit)
+
+
+###############################################################
+# Bölümlenmiş Parquet Üzerinde CLTV (Out-of-Core CLTV)
+###############################################################
+
+# Tüm işlem geçmişi tek bir DataFrame'e sığmadığında temizlenmiş işlemler ay bazında bölümlenmiş
+# bir Parquet dizinine yazılır (kök/month=2010-12/...parquet). Her bölüm bir işçi süreçte okunup
+# müşteri bazında kısmi toplamlara indirgenir; ana süreç yalnızca bu tabloları birleştirir ve
+# bellek kullanımı satır sayısıyla değil müşteri sayısıyla büyür.
+# Bir faturanın tek bir InvoiceDate'i, dolayısıyla tek bir ayı vardır; bölüm başına farklı fatura
+# sayılarının toplamı kesin total_transaction'dır. Bölümleme faturaları bölebiliyorsa
+# invoices_span_partitions=True verilir: işçiler paketlenmiş (Customer ID, Invoice) anahtarlarını da döndürür ve
+# sayım birleştirilmiş çiftlerden yapılır (bellek fatura sayısıyla büyür).
+
+PARTITION_COLUMNS = ['Customer ID', 'Invoice', 'Quantity', 'TotalPrice']
+
+
+def write_partitioned_transactions(source, root, chunksize=1_000_000):
+    # source: DataFrame ya da .csv/.parquet dosya yolu. Parçalar temizlenip month=YYYY-MM
+    # dizinlerine eklenir; aynı köke tekrar yazmak yeni dosyalar ekler.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    chunks = [source] if isinstance(source, pd.DataFrame) else read_transactions(source, chunksize)
+    for chunk in chunks:
+        chunk = clean_transactions(chunk)
+        months, codes = np.unique(chunk['InvoiceDate'].to_numpy().astype('datetime64[M]'), return_inverse=True)
+        chunk['month'] = months.astype(str)[codes]
+        pq.write_to_dataset(pa.Table.from_pandas(chunk, preserve_index=False), root, partition_cols=['month'])
+    return root
+
+
+def _cltv_partition(path, return_pairs=False):
+    import pyarrow.parquet as pq
+
+    dataframe = pq.read_table(path, columns=PARTITION_COLUMNS).to_pandas()
+    invoice_codes = encode_invoices(dataframe['Invoice'])
+    grouped = dataframe.groupby('Customer ID')
+    partial = pd.DataFrame({'total_transaction': distinct_invoice_counts(dataframe['Customer ID'], invoice_codes),
+                            'total_unit': grouped['Quantity'].sum(),
+                            'total_price': grouped['TotalPrice'].sum()})
+    pairs = None
+    if return_pairs:
+        # bölüm içi müşteri kodlarıyla paketlenir; ortak kodlara ana süreçte çevrilir
+        codes, customer_ids = pd.factorize(dataframe['Customer ID'])
+        pairs = (unique_pairs(pack_invoice_pairs(codes, invoice_codes)), customer_ids)
+    return partial, pairs
+
+
+def partitioned_cltv_c(root, profit=0.10, max_workers=None, invoices_span_partitions=False):
+    partitions = sorted(entry.path for entry in os.scandir(root) if entry.is_dir())
+    if not partitions:
+        raise ValueError(f"{root} altında bölüm dizini bulunamadı")
+
+    customers = None
+    pairs = []
+    customer_ids = None
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for partial, partial_pairs in pool.map(_cltv_partition, partitions, repeat(invoices_span_partitions)):
+            customers = partial if customers is None else customers.add(partial, fill_value=0)
+            if partial_pairs is not None:
+                keys, partition_ids = partial_pairs
+                codes, customer_ids = customer_codes(partition_ids, customer_ids)
+                pairs.append(recode_invoice_pairs(keys, codes))
+
+    if invoices_span_partitions:
+        customers['total_transaction'] = count_packed_pairs(unique_pairs(np.concatenate(pairs)), customer_ids)
+    customers = customers.sort_index().astype({'total_transaction': 'int64', 'total_unit': 'int64'})
+    return cltv_c_metrics(customers, profit)
+
+
+###############################################################
+# Segment Kayması (CLTV Segment Drift)
+###############################################################
+
+# Her create_cltv_c çalıştırmasının segment sınırları, segment özetleri (count, mean, sum) ve
+# müşteri -> segment eşlemesi küçük bir dosya olarak saklanır (store/<run>.pkl); kayıt sırası
+# store/runs.csv dizinindedir. Yeni çalıştırma önceki ham veriyi okumadan kendisi dışındaki en son
+# kayıtla karşılaştırılır:
+#   psi        : önceki sınırlarla bölünen yeni cltv dağılımının nüfus kararlılık endeksi
+#                (< 0.1 kararlı, 0.1 - 0.25 izlenmeli, > 0.25 belirgin kayma)
+#   boundaries : çeyreklik sınırlarının eski/yeni değerleri ve değişimi
+#   summary    : segment başına count, mean, sum ve farkları
+#   migration  : iki çalıştırmada da olan müşterilerin segment geçiş matrisi (satır: önceki)
+#   new, lost  : yeni gelen ve artık görünmeyen müşteri sayıları
+
+SEGMENT_LABELS = ["D", "C", "B", "A"]
+
+
+def cltv_baseline(cltv_c, run):
+    segment = pd.Categorical(cltv_c['segment'], categories=SEGMENT_LABELS, ordered=True)
+    summary = cltv_c.groupby(segment, observed=False)['cltv'].agg(['count', 'mean', 'sum'])
+    summary.index = pd.CategoricalIndex(summary.index, name='segment')
+    return {'run': run,
+            'boundaries': cltv_c['cltv'].quantile(np.linspace(0, 1, len(SEGMENT_LABELS) + 1)).to_numpy(),
+            'summary': summary,
+            'segments': pd.Series(segment.codes, index=cltv_c.index, name='segment')}
+
+
+def cltv_runs(store='cltv_drift'):
+    # kayıt sırası store/runs.csv dizin dosyasında tutulur (run, saved_at); eski sürümlerin dizin
+    # dosyası olmayan kayıtları dosya değişiklik zamanına göre sıralanır
+    index_path = os.path.join(store, 'runs.csv')
+    if os.path.exists(index_path):
+        return pd.read_csv(index_path, dtype={'run': str}, parse_dates=['saved_at'])
+    entries = sorted((entry.stat().st_mtime, entry.name[:-4]) for entry in os.scandir(store)
+                     if entry.name.endswith('.pkl')) if os.path.isdir(store) else []
+    return pd.DataFrame({'run': pd.Series([run for _, run in entries], dtype=str),
+                         'saved_at': pd.to_datetime([mtime for mtime, _ in entries], unit='s')})
+
+
+def save_cltv_baseline(baseline, store='cltv_drift'):
+    # aynı run tekrar kaydedilirse dizinde en sona taşınır
+    runs = cltv_runs(store)
+    os.makedirs(store, exist_ok=True)
+    pd.to_pickle(baseline, os.path.join(store, f"{baseline['run']}.pkl"))
+    runs = pd.concat([runs[runs['run'] != str(baseline['run'])],
+                      pd.DataFrame({'run': [str(baseline['run'])], 'saved_at': [pd.Timestamp.now()]})])
+    runs.to_csv(os.path.join(store, 'runs.csv'), index=False)
+
+
+def load_cltv_baseline(store='cltv_drift', run=None, exclude=None):
+    # run verilmezse exclude dışındaki en son kaydedilen kayıt döner, kayıt yoksa None
+    if run is None:
+        runs = cltv_runs(store)['run']
+        runs = runs[runs != str(exclude)] if exclude is not None else runs
+        if runs.empty:
+            return None
+        run = runs.iloc[-1]
+    return pd.read_pickle(os.path.join(store, f"{run}.pkl"))
+
+
+def population_stability(expected_counts, actual_counts, floor=1e-4):
+    expected = np.maximum(expected_counts / expected_counts.sum(), floor)
+    actual = np.maximum(actual_counts / actual_counts.sum(), floor)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def cltv_drift(cltv_c, baseline, run=None):
+    current = cltv_baseline(cltv_c, run)
+    labels = pd.CategoricalIndex(SEGMENT_LABELS, categories=SEGMENT_LABELS, ordered=True, name='segment')
+
+    # yeni cltv değerleri önceki sınırlarla bölünür (pd.qcut aralıkları (e_i, e_i+1])
+    bins = np.searchsorted(baseline['boundaries'][1:-1], cltv_c['cltv'].to_numpy(), side='left')
+    actual_counts = np.bincount(bins, minlength=len(SEGMENT_LABELS))
+    psi = population_stability(baseline['summary']['count'].to_numpy(dtype=np.float64), actual_counts)
+
+    boundaries = pd.DataFrame({'baseline': baseline['boundaries'], 'current': current['boundaries']},
+                              index=pd.Index(['min', 'q25', 'q50', 'q75', 'max'], name='boundary'))
+    boundaries['shift'] = boundaries['current'] - boundaries['baseline']
+    boundaries['shift_pct'] = boundaries['shift'] / boundaries['baseline'].abs()
+
+    summary = pd.concat({'baseline': baseline['summary'], 'current': current['summary']}, axis=1)
+    for stat in ['count', 'mean', 'sum']:
+        summary[('change', stat)] = summary[('current', stat)] - summary[('baseline', stat)]
+
+    previous = baseline['segments']
+    position = previous.index.get_indexer(current['segments'].index)
+    both = position >= 0
+    pairs = previous.to_numpy()[position[both]] * len(SEGMENT_LABELS) + current['segments'].to_numpy()[both]
+    migration = pd.DataFrame(np.bincount(pairs, minlength=len(SEGMENT_LABELS) ** 2)
+                             .reshape(len(SEGMENT_LABELS), len(SEGMENT_LABELS)),
+                             index=labels.rename('from_segment'), columns=labels.rename('to_segment'))
+
+    return {'baseline_run': baseline['run'], 'run': run, 'psi': psi, 'boundaries': boundaries,
+            'summary': summary, 'migration': migration,
+            'new': int((~both).sum()), 'lost': int(len(previous) - both.sum())}
+
+
+def cltv_drift_report(cltv_c, run, store='cltv_drift', save=True):
+    # bu run dışındaki son kayda göre kayma raporu (ilk çalıştırmada None) ve bu çalıştırmanın
+    # kaydedilmesi; aynı run tekrar çalıştırılırsa kendisiyle değil önceki kayıtla karşılaştırılır
+    baseline = load_cltv_baseline(store, exclude=run)
+    drift = cltv_drift(cltv_c, baseline, run) if baseline is not None else None
+    if save:
+        save_cltv_baseline(cltv_baseline(cltv_c, run), store)
+    return drift
+
+
+###############################################################
+# Tembel CLTV Zinciri (Lazy CLTV Expression Graph)
+###############################################################
+
+# cltv_c_metrics her formül için DataFrame'e yeni bir sütun ekler; sadece cltv ve segment
+# gerekse bile avg_order_value, purchase_frequency, profit_margin ve customer_value ayrı ayrı
+# bellekte tutulur. LazyCLTV formülleri kaydeder, istenen çıktılar için gerekmeyen adımları atar
+# ve kalan adımları ufunc'ların out= parametresiyle az sayıda tampon üzerinde hesaplar: ömrü biten
+# bir ara sonucun tamponu sonraki adımda yeniden kullanılır. İşlem sırası cltv_c_metrics ile
+# aynıdır, sonuçlar birebir eşittir.
+#
+#   LazyCLTV(cltv_c, profit=0.10).select('cltv', 'segment').explain()
+#   LazyCLTV(cltv_c, profit=0.10).select('cltv', 'segment').collect()
+
+# formül: (ilk işlenen, (işlem, işlenen), ...) soldan sağa uygulanır; sıra bağımlılık sırasıdır
+CLTV_FORMULAS = {
+    'avg_order_value': ('total_price', ('/', 'total_transaction')),
+    'purchase_frequency': ('total_transaction', ('/', 'n')),
+    'profit_margin': ('total_price', ('*', 'profit')),
+    'customer_value': ('avg_order_value', ('*', 'purchase_frequency')),
+    'cltv': ('customer_value', ('/', 'churn_rate'), ('*', 'profit_margin')),
+}
+CLTV_UFUNCS = {'/': np.divide, '*': np.multiply}
+CLTV_INPUTS = ['total_transaction', 'total_unit', 'total_price']
+CLTV_SCALARS = ['n', 'churn_rate', 'profit']
+
+
+class LazyCLTV:
+    def __init__(self, cltv_c, profit=0.10, columns=None):
+        self.cltv_c = cltv_c
+        self.profit = profit
+        # varsayılan çıktı cltv_c_metrics ile aynı sütunlardır
+        self.columns = list(columns or CLTV_INPUTS + list(CLTV_FORMULAS) + ['segment'])
+
+    def select(self, *columns):
+        unknown = set(columns) - set(CLTV_INPUTS) - set(CLTV_FORMULAS) - {'segment'}
+        if unknown:
+            raise ValueError(f"Bilinmeyen sütun: {sorted(unknown)}")
+        return LazyCLTV(self.cltv_c, self.profit, columns)
+
+    @staticmethod
+    def _operands(name):
+        base, *ops = CLTV_FORMULAS[name]
+        return [base] + [operand for _, operand in ops]
+
+    def _plan(self):
+        # gereken formüller çıktılardan geriye doğru (derinlik öncelikli) bulunur; her adım hemen
+        # ihtiyaç duyulduğu yerde hesaplanır, böylece aynı anda yaşayan ara sonuç sayısı azalır
+        targets = set(self.columns) | ({'cltv'} if 'segment' in self.columns else set())
+        steps = []
+
+        def visit(name):
+            if name in CLTV_FORMULAS and name not in steps:
+                for operand in self._operands(name):
+                    visit(operand)
+                steps.append(name)
+
+        for name in CLTV_FORMULAS:
+            if name in targets:
+                visit(name)
+
+        last_use = {}
+        for i, name in enumerate(steps):
+            for operand in self._operands(name):
+                last_use[operand] = i
+
+        plan, buffers, free, n_buffers = [], {}, [], 0
+        for i, name in enumerate(steps):
+            base = CLTV_FORMULAS[name][0]
+            in_place = base in buffers and last_use[base] == i and base not in targets
+            if in_place:
+                buffer = buffers.pop(base)
+            elif free:
+                buffer = free.pop()
+            else:
+                buffer, n_buffers = n_buffers, n_buffers + 1
+            buffers[name] = buffer
+            plan.append((name, buffer, in_place))
+            for operand in list(buffers):
+                if operand != name and last_use.get(operand) == i and operand not in targets:
+                    free.append(buffers.pop(operand))
+        pruned = [name for name in CLTV_FORMULAS if name not in steps]
+        return plan, pruned, n_buffers
+
+    def explain(self):
+        plan, pruned, n_buffers = self._plan()
+        lines = [f"LazyCLTV çıktılar: {', '.join(self.columns)}",
+                 "  n = len(total_transaction)",
+                 "  churn_rate = 1 - (total_transaction > 1).sum() / n",
+                 f"  profit = {self.profit}"]
+        for name, buffer, in_place in plan:
+            base, *ops = CLTV_FORMULAS[name]
+            formula = ' '.join([base] + [f"{op} {operand}" for op, operand in ops])
+            lines.append(f"  buf{buffer} <- {name} = {formula}" + ("   (yerinde)" if in_place else ""))
+        if 'segment' in self.columns:
+            lines.append("  segment = qcut(cltv, 4, D..A)")
+        if pruned:
+            lines.append(f"  atlanan adımlar: {', '.join(pruned)}")
+        lines.append(f"  tampon: {n_buffers} x {len(self.cltv_c):,} float64 "
+                     f"(cltv_c_metrics: {len(CLTV_FORMULAS)} sütun + girdi kopyası)")
+        return '\n'.join(lines)
+
+    def collect(self):
+        plan, _, n_buffers = self._plan()
+        n = len(self.cltv_c)
+        values = {col: self.cltv_c[col].to_numpy() for col in CLTV_INPUTS if col in self.cltv_c}
+        values['n'] = n
+        values['churn_rate'] = 1 - np.count_nonzero(values['total_transaction'] > 1) / n
+        values['profit'] = self.profit
+
+        pool = [np.empty(n) for _ in range(n_buffers)]
+        for name, buffer, _ in plan:
+            base, *ops = CLTV_FORMULAS[name]
+            out = pool[buffer]
+            left = values[base]
+            for op, operand in ops:
+                CLTV_UFUNCS[op](left, values[operand], out=out)
+                left = out
+            values[name] = out
+
+        result = pd.DataFrame({col: values[col] for col in self.columns if col != 'segment'},
+                              index=self.cltv_c.index, copy=False)
+        if 'segment' in self.columns:
+            result['segment'] = pd.qcut(pd.Series(values['cltv'], index=self.cltv_c.index), 4,
+                                        labels=["D", "C", "B", "A"])
+        return result
+
+
+###############################################################
+# Sütunsal CLTV Dışa Aktarımı (Bulk Columnar Export)
+###############################################################
+
+# cltv_c.to_csv / cltv_final.to_csv metin dosyaları yazar; okuyan sistemler her sayıyı yeniden ayrıştırır.
+# write_cltv çıktıyı zstd sıkıştırmalı Parquet olarak yazar: satırlar segmente göre (A'dan D'ye) sıralanır
+# ve her row group tek bir segmentten oluşur. Parquet her row group için sütunların min/max istatistiklerini
+# saklar; read_cltv(path, segments=["A"]) diğer segmentlerin row group'larını okumadan atlar.
+# Şema (sütun tipleri, index, kategorik segment) ve kind/profit gibi bilgiler dosyanın içindedir.
+
+def write_cltv(cltv, path, kind='cltv_c', row_group_size=65_536, compression='zstd', **metadata):
+    # kind: 'cltv_c' (create_cltv_c) ya da 'cltv_p' (create_cltv_p); metadata: ek anahtar/değerler (profit=0.10 gibi)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    order = np.argsort(-pd.Categorical(cltv['segment']).codes, kind='stable')
+    cltv = cltv.iloc[order]
+    # create_cltv_c'de index Customer ID'dir; create_cltv_p'deki isimsiz sıra index'i yazılmaz
+    table = pa.Table.from_pandas(cltv, preserve_index=cltv.index.name is not None)
+    info = {b'cltv.kind': kind.encode(), **{f'cltv.{key}'.encode(): str(value).encode()
+                                            for key, value in metadata.items()}}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **info})
+
+    segment = table.column('segment').combine_chunks()
+    bounds = np.flatnonzero(np.diff(np.r_[-1, segment.indices.to_numpy(zero_copy_only=False), -1]))
+    with pq.ParquetWriter(path, table.schema, compression=compression) as writer:
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            writer.write_table(table.slice(start, stop - start), row_group_size=row_group_size)
+    return path
+
+
+def read_cltv(path, segments=None, columns=None):
+    # dosya bellek eşlemeli açılır; segments verilirse yalnızca o segmentlerin row group'ları okunur
+    import pyarrow.parquet as pq
+
+    filters = [('segment', 'in', list(segments))] if segments is not None else None
+    table = pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+    return table.to_pandas()
+
+
+def cltv_file_summary(path):
+    # row group başına satır sayısı ve sütun istatistikleri (min/max), dosya bilgileri
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path, memory_map=True)
+    rows = []
+    for i in range(parquet.num_row_groups):
+        group = parquet.metadata.row_group(i)
+        row = {'row_group': i, 'num_rows': group.num_rows, 'bytes': group.total_byte_size}
+        for j in range(group.num_columns):
+            column = group.column(j)
+            if column.statistics is not None and column.statistics.has_min_max:
+                row[f'{column.path_in_schema}_min'] = column.statistics.min
+                row[f'{column.path_in_schema}_max'] = column.statistics.max
+        rows.append(row)
+    metadata = {key.decode()[5:]: value.decode() for key, value in parquet.schema_arrow.metadata.items()
+                if key.startswith(b'cltv.')}
+    return metadata, pd.DataFrame(rows).set_index('row_group')
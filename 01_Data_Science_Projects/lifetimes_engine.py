@@ -0,0 +1,560 @@
+###############################################################
+# BG-NBD / Gamma-Gamma Yardımcıları (Lifetimes Helpers)
+###############################################################
+
+# 04_2_cltv_prediction.py içindeki create_cltv_p fonksiyonunun veri hazırlama adımları.
+
+import datetime as dt
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import digamma, gammaln, hyp2f1
+
+from retail_io import (INVOICE_CODE_BITS, clean_transactions, count_packed_pairs, customer_codes, encode_invoices,
+                       pack_invoice_pairs, read_transactions, unique_pairs)
+
+
+###############################################################
+# Lifetime Veri Yapısı (recency, T, frequency, monetary)
+###############################################################
+
+def lifetimes_summary_from_aggregates(customers, today_date=dt.datetime(2011, 12, 11)):
+    # müşteri toplamlarından haftalık recency/T, frequency ve ortalama monetary;
+    # create_cltv_p'deki gibi sadece tekrar eden (frequency > 1) müşteriler kalır
+    cltv_df = pd.DataFrame({'recency': (customers['last_invoice_date'] - customers['first_invoice_date']).dt.days,
+                            'T': (today_date - customers['first_invoice_date']).dt.days,
+                            'frequency': customers['total_transaction'],
+                            'monetary': customers['total_price'] / customers['total_transaction']})
+    cltv_df = cltv_df[(cltv_df['frequency'] > 1)].copy()
+    cltv_df["recency"] = cltv_df["recency"] / 7
+    cltv_df["T"] = cltv_df["T"] / 7
+    return cltv_df
+
+
+def stream_lifetimes_summary(path, caps=None, today_date=dt.datetime(2011, 12, 11), chunksize=1_000_000):
+    # caps: tüm veri üzerinde bulunmuş Quantity/Price üst sınırları (replace_with_thresholds)
+    return lifetimes_summary(clean_transaction_chunks(path, caps, chunksize), today_date)
+
+
+def clean_transaction_chunks(path, caps=None, chunksize=1_000_000):
+    # create_cltv_p temizliği (Price > 0 dahil) uygulanmış parçalar; ham parça temizlendikten sonra bırakılır
+    for chunk in read_transactions(path, chunksize):
+        chunk = clean_transactions(chunk, positive_price=True, caps=caps)
+        yield chunk
+
+
+###############################################################
+# Tek Sıralı Geçişte Lifetime Tablosu (Sorted-Pass Summary Builder)
+###############################################################
+
+# create_cltv_p dört lambda'lı groupby.agg ile recency/T/frequency/monetary'yi hesaplar (ilk ve son
+# tarih için iki ayrı lambda), sonra gün sayılarını ayrı geçişlerde 7'ye böler. Burada her parçada
+# (Customer ID, Invoice) anahtarı paketlenip bir kez sıralanır; ilk/son tarih datetime64 tamsayıları
+# (ns) üzerinde np.minimum/maximum.reduceat ile, tutar np.add.reduceat ile müşteri bloklarında toplanır.
+# Parçaların müşteri toplamları birleştirilir; bellekte yalnızca müşteri başına dört değer ve tekil
+# (müşteri, fatura) anahtarları (fatura başına 8 bayt) kalır, bellek satır sayısıyla büyümez. calibration_end
+# verilirse lifetimes calibration_and_holdout_data gibi kalibrasyon / holdout tablosu döner.
+
+SUMMARY_TIME_UNITS = {'D': 1, 'W': 7, 'M': 30}
+NS_PER_DAY = 86_400 * 10 ** 9
+
+
+def _empty_customer_partials():
+    return {'customers': np.empty(0, np.int64), 'first': np.empty(0, np.int64), 'last': np.empty(0, np.int64),
+            'revenue': np.empty(0, np.float64), 'pairs': []}
+
+
+def _reduce_customer_partials(keys, first, last, revenue, pairs):
+    # keys müşteriye göre sıralı; müşteri blokları üzerinde ilk/son tarih ve toplam tutar
+    customers = keys >> INVOICE_CODE_BITS
+    if not len(customers):
+        return dict(_empty_customer_partials(), pairs=pairs)
+    starts = np.flatnonzero(np.r_[True, customers[1:] != customers[:-1]])
+    return {'customers': customers[starts],
+            'first': np.minimum.reduceat(first, starts),
+            'last': np.maximum.reduceat(last, starts),
+            'revenue': np.add.reduceat(revenue, starts),
+            'pairs': pairs}
+
+
+def customer_partials(customers, invoice_codes, dates, revenue):
+    # customers: parçalar arasında ortak müşteri kodları (customer_codes). Tek sıralama: (müşteri, fatura) anahtarı; aynı faturanın satırları ardışık kalır
+    keys = pack_invoice_pairs(customers, invoice_codes)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    dates = dates[order]
+    pairs = keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+    return _reduce_customer_partials(keys, dates, dates, revenue[order], [pairs])
+
+
+def merge_customer_partials(left, right):
+    keys = np.concatenate([left['customers'], right['customers']]) << INVOICE_CODE_BITS
+    order = np.argsort(keys, kind='stable')
+    return _reduce_customer_partials(keys[order],
+                                     np.concatenate([left['first'], right['first']])[order],
+                                     np.concatenate([left['last'], right['last']])[order],
+                                     np.concatenate([left['revenue'], right['revenue']])[order],
+                                     left['pairs'] + right['pairs'])
+
+
+def finalize_customer_partials(partials):
+    # müşteri başına farklı fatura sayısı; tüm parçaların çiftleri bir kez tekilleştirilir
+    keys = unique_pairs(np.concatenate([np.empty(0, np.int64)] + partials['pairs']))
+    frequency = count_packed_pairs(keys).to_numpy()
+    return dict(partials, frequency=frequency, pairs=[keys])
+
+
+def _chunk_period_partials(chunk, observation_end, calibration_end, customer_ids):
+    # kalibrasyon (InvoiceDate <= calibration_end) ve holdout (calibration_end < InvoiceDate <= observation_end)
+    # dönemlerinin bir parçadaki müşteri toplamları; satırı olmayan dönem için None
+    dates = chunk['InvoiceDate'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    customers, customer_ids = customer_codes(chunk['Customer ID'], customer_ids)
+    invoice_codes = encode_invoices(chunk['Invoice'])
+    revenue = chunk['TotalPrice'].to_numpy(dtype=np.float64)
+    in_calibration = dates <= calibration_end
+    partials = []
+    for mask in [in_calibration, ~in_calibration & (dates <= observation_end)]:
+        if mask.all():
+            partials.append(customer_partials(customers, invoice_codes, dates, revenue))
+        elif mask.any():
+            partials.append(customer_partials(customers[mask], invoice_codes[mask], dates[mask], revenue[mask]))
+        else:
+            partials.append(None)
+    return partials, customer_ids
+
+
+def _period_partials(chunks, observation_end, calibration_end):
+    # calibration_end = observation_end ise tüm satırlar kalibrasyondadır. Müşteri kodları parçalar
+    # arasında ortaktır; customer_ids kod -> Customer ID eşlemesidir.
+    periods = [_empty_customer_partials(), _empty_customer_partials()]
+    customer_ids = None
+    for chunk in chunks:
+        partials, customer_ids = _chunk_period_partials(chunk, observation_end, calibration_end, customer_ids)
+        # bir sonraki parça okunurken bu parça bellekte tutulmaz
+        del chunk
+        periods = [period if partial is None else merge_customer_partials(period, partial)
+                   for period, partial in zip(periods, partials)]
+    calibration, holdout = (finalize_customer_partials(period) for period in periods)
+    if customer_ids is None:
+        customer_ids = pd.Index([], dtype='float64', name='Customer ID')
+    return calibration, holdout, customer_ids
+
+
+def lifetimes_summary(transactions, observation_end=dt.datetime(2011, 12, 11), freq='W', calibration_end=None,
+                      min_frequency=2):
+    # transactions: clean_transactions çıktısı (Customer ID, Invoice, InvoiceDate, TotalPrice) ya da bu
+    # biçimde parçalar üreten bir iterable. freq: 'D', 'W', 'M' (30 gün) ya da gün sayısı.
+    # Varsayılanlarla create_cltv_p'deki cltv_df ile aynı tablo döner (frequency > 1 müşteriler).
+    unit = SUMMARY_TIME_UNITS[freq] if isinstance(freq, str) else freq
+    if isinstance(transactions, pd.DataFrame):
+        transactions = [transactions]
+    end = np.datetime64(observation_end, 'ns').astype(np.int64)
+    split = end if calibration_end is None else np.datetime64(calibration_end, 'ns').astype(np.int64)
+    if split > end:
+        raise ValueError("calibration_end, observation_end'den sonra olamaz")
+    calibration, holdout, customer_ids = _period_partials(transactions, end, split)
+
+    # Timedelta.days gibi tam gün sayısı (aşağı yuvarlama); dizin önce müşteri kodudur
+    summary = pd.DataFrame({'recency': (calibration['last'] - calibration['first']) // NS_PER_DAY / unit,
+                            'T': (split - calibration['first']) // NS_PER_DAY / unit,
+                            'frequency': calibration['frequency'],
+                            'monetary': calibration['revenue'] / calibration['frequency']},
+                           index=calibration['customers'])
+    summary = summary[summary['frequency'] >= min_frequency]
+    if calibration_end is not None:
+        summary.columns = ['recency_cal', 'T_cal', 'frequency_cal', 'monetary_cal']
+        # holdout'ta alışverişi olmayan müşteriler için frequency_holdout = monetary_holdout = 0
+        holdout = pd.DataFrame({'frequency': holdout['frequency'], 'revenue': holdout['revenue']},
+                               index=holdout['customers']).reindex(summary.index, fill_value=0)
+        frequency = holdout['frequency'].to_numpy()
+        revenue = holdout['revenue'].to_numpy(dtype=np.float64)
+        summary['frequency_holdout'] = frequency
+        summary['monetary_holdout'] = np.divide(revenue, frequency, out=np.zeros(len(summary)), where=frequency > 0)
+        summary['duration_holdout'] = (end - split) // NS_PER_DAY / unit
+
+    # kodlar parçalardaki ilk görülme sırasındadır; Customer ID'ye çevrilip sıralanır
+    summary.index = customer_ids.take(summary.index.to_numpy())
+    return summary.sort_index()
+
+
+###############################################################
+# Çok Ufuklu BG-NBD Tahmini (Multi-Horizon BG-NBD Prediction)
+###############################################################
+
+# create_cltv_p bgf.predict'i 1, 4 ve 12 hafta için ayrı ayrı çağırır; her çağrı aynı terimleri
+# (a + b + x - 1) / (a - 1), payda ve hyp2f1 parametrelerini yeniden hesaplar ve alternatif hyp2f1
+# formülünü her satır için değerlendirir. Burada ufka bağlı olmayan terimler bir kez hesaplanır,
+# ufka bağlı kısım (müşteri x ufuk) matrisi olarak tek seferde yayınlanır (broadcast). hyp2f1 yalnızca
+# (frequency, T) değerlerine bağlı olduğundan aynı (frequency, T) çiftine sahip müşteriler için bir kez
+# hesaplanır; alternatif formül sadece sonsuz çıkan hücrelerde kullanılır.
+# Formül: Fader, Hardie & Lee (2005), denklem (10); lifetimes BetaGeoFitter.predict ile aynıdır.
+
+def _bgnbd_expected_terms(params, horizons, frequency, recency, T):
+    # beklenen satın alma = numerator[codes] / denominator[:, None]; numerator (frequency, T) çifti x ufuk
+    r, alpha, a, b = (params[name] for name in ['r', 'alpha', 'a', 'b'])
+    horizons = np.asarray(horizons, dtype=np.float64)
+    frequency, recency, T = (np.asarray(values, dtype=np.float64) for values in (frequency, recency, T))
+
+    # aynı (frequency, T) çiftleri: iki sütun ayrı factorize edilip kodlar tek tamsayıda birleştirilir
+    frequency_codes, frequencies = pd.factorize(frequency, use_na_sentinel=False)
+    T_codes, ages = pd.factorize(T, use_na_sentinel=False)
+    codes, pairs = pd.factorize(frequency_codes.astype(np.int64) * len(ages) + T_codes)
+    x = frequencies[pairs // len(ages)][:, None]
+    age = ages[pairs % len(ages)][:, None]
+
+    _a = r + x
+    _b = b + x
+    _c = a + b + x - 1
+    _z = horizons / (alpha + age + horizons)
+    with np.errstate(divide='ignore'):
+        ln_hyp_term = np.log(hyp2f1(_a, _b, _c, _z))
+    # sonsuz çıkan hücrelerde eşdeğer alternatif formül
+    bad = np.isinf(ln_hyp_term)
+    if bad.any():
+        rows, cols = np.nonzero(bad)
+        c, z = _c[rows, 0], _z[rows, cols]
+        ln_hyp_term[bad] = (np.log(hyp2f1(c - _a[rows, 0], c - _b[rows, 0], c, z))
+                            + (c - _a[rows, 0] - _b[rows, 0]) * np.log(1 - z))
+    first_term = (a + b + x - 1) / (a - 1)
+    second_term = 1 - np.exp(ln_hyp_term + (r + x) * np.log((alpha + age) / (alpha + horizons + age)))
+    numerator = first_term * second_term
+
+    denominator = 1 + (frequency > 0) * (a / (b + frequency - 1)) * ((alpha + T) / (alpha + recency)) ** (r + frequency)
+    return numerator, codes, denominator
+
+
+def bgnbd_expected_purchases(params, horizons, frequency, recency, T):
+    # params: bgf.params_ ya da r, alpha, a, b anahtarlı sözlük; horizons: T ile aynı birimde ufuklar.
+    # Dönen tablo: satırlar müşteriler, sütunlar ufuklar.
+    columns = pd.Index(np.atleast_1d(horizons), name='horizon')
+    index = frequency.index if isinstance(frequency, pd.Series) else None
+    numerator, codes, denominator = _bgnbd_expected_terms(params, columns.to_numpy(dtype=np.float64),
+                                                          frequency, recency, T)
+    return pd.DataFrame(numerator[codes] / denominator[:, None], index=index, columns=columns)
+
+
+###############################################################
+# İndirgenmiş CLTV (Discounted CLV for Many Horizons)
+###############################################################
+
+# ggf.customer_lifetime_value her ay için bgf.predict'i iki kez çağırıp farkı iskonto ederek toplar;
+# ufuk uzadıkça çağrı sayısı doğrusal artar. Burada 0, 1, ..., M aylık birikimli beklenen satın almalar
+# bgnbd_expected_purchases ile tek yayında hesaplanır, aylık artışlar (np.diff) iskonto matrisiyle
+# (ay x ufuk, ufuktan sonraki aylar 0) çarpılarak bütün ufuklar tek matris çarpımında toplanır.
+# Artışlar (frequency, T) çifti düzeyinde alınır; müşteri x ay matrisi hiç oluşmaz.
+
+CLV_TIME_FACTORS = {'W': 4.345, 'M': 1.0, 'D': 30, 'H': 30 * 24}
+
+
+def customer_lifetime_value(params, months, frequency, recency, T, monetary_value, discount_rate=0.01, freq='W'):
+    # lifetimes ggf.customer_lifetime_value(bgf, ..., time=month) ile aynı; monetary_value olarak
+    # Gamma-Gamma beklenen ortalama kârı verilir (gamma_gamma_expected_profit ya da
+    # ggf.conditional_expected_average_profit). Dönen tablo: satırlar müşteriler, sütunlar aylık ufuklar.
+    factor = CLV_TIME_FACTORS[freq]
+    columns = pd.Index(np.atleast_1d(months), name='month')
+    months = columns.to_numpy(dtype=np.int64)
+    if (months < 1).any():
+        raise ValueError("months pozitif tamsayı olmalı")
+    index = frequency.index if isinstance(frequency, pd.Series) else None
+
+    times = np.arange(months.max() + 1) * factor
+    numerator, codes, denominator = _bgnbd_expected_terms(params, times, frequency, recency, T)
+    increments = np.diff(numerator, axis=1)
+    steps = times[1:]
+    discount = 1 / (1 + discount_rate) ** (steps / factor)
+    discount_matrix = np.where(np.arange(1, len(steps) + 1)[:, None] <= months, discount[:, None], 0.0)
+    clv = (increments @ discount_matrix)[codes]
+    clv *= (np.asarray(monetary_value, dtype=np.float64) / denominator)[:, None]
+    return pd.DataFrame(clv, index=index, columns=columns)
+
+
+###############################################################
+# BG-NBD Modelinin Kurulması (Native BG-NBD Fitter)
+###############################################################
+
+# BetaGeoFitter her müşteri için log-olabilirliği autograd ile hesaplar. Burada müşteriler önce
+# tekil (frequency, recency, T) örüntülerine indirgenir (Fader & Hardie'nin önerdiği sıkıştırma;
+# günlük veride örüntü sayısı müşteri sayısından çok daha yavaş büyür) ve ağırlıklı log-olabilirlik
+# analitik gradyanla BFGS ile en büyütülür. Amaç fonksiyonu, başlangıç noktası, zaman ölçeklemesi
+# (en büyük T = 1) ve L2 cezası (penalizer_coef * sum(params ** 2)) lifetimes ile aynıdır.
+
+def bgnbd_patterns(frequency, recency, T):
+    # tekil (frequency, recency, T) örüntüleri ve her müşterinin örüntü numarası
+    columns = [np.asarray(values, dtype=np.float64) for values in (frequency, recency, T)]
+    key = np.zeros(len(columns[0]), dtype=np.int64)
+    uniques = []
+    for values in columns:
+        codes, values_unique = pd.factorize(values)
+        key = key * len(values_unique) + codes
+        uniques.append(values_unique)
+    codes, keys = pd.factorize(key)
+    weights = np.bincount(codes, minlength=len(keys))
+    levels = []
+    for values_unique in reversed(uniques):
+        levels.append(values_unique[keys % len(values_unique)])
+        keys = keys // len(values_unique)
+    frequency, recency, T = reversed(levels)
+    patterns = pd.DataFrame({'frequency': frequency, 'recency': recency, 'T': T, 'weights': weights})
+    return patterns, codes
+
+
+def bgnbd_negative_log_likelihood(log_params, frequency, recency, T, weights, penalizer_coef=0.0):
+    # lifetimes BetaGeoFitter._negative_log_likelihood ve log parametrelere göre gradyanı.
+    # Yalnızca frequency'ye bağlı gammaln/digamma terimleri tekil frequency değerlerinde (birkaç yüz)
+    # hesaplanır ve bu değerlerin toplam ağırlıklarıyla toplanır; örüntü başına sadece log/exp kalır.
+    r, alpha, a, b = params = np.exp(log_params)
+    x_codes, x = pd.factorize(frequency)
+    x_weights = np.bincount(x_codes, weights=weights, minlength=len(x))
+    total_weight = x_weights.sum()
+
+    A_1_2 = (gammaln(r + x) - gammaln(r) + r * np.log(alpha)
+             + gammaln(a + b) + gammaln(b + x) - gammaln(b) - gammaln(a + b + x))
+    b_x = (b + np.maximum(x, 1) - 1)[x_codes]
+
+    r_x = r + frequency
+    log_alpha_T = np.log(alpha + T)
+    log_alpha_recency = np.log(recency + alpha)
+    A_3 = -r_x * log_alpha_T
+    A_4 = np.log(a) - np.log(b_x) - r_x * log_alpha_recency
+    max_A_3_A_4 = np.maximum(A_3, A_4)
+    e_3 = np.exp(A_3 - max_A_3_A_4)
+    e_4 = np.exp(A_4 - max_A_3_A_4) * (frequency > 0)
+    total = e_3 + e_4
+    ll = x_weights @ A_1_2 + weights @ (np.log(total) + max_A_3_A_4)
+
+    # log-sum-exp teriminin A_3 ve A_4 ağırlıkları
+    w_3 = weights * e_3 / total
+    w_4 = weights * e_4 / total
+    d_r = (x_weights @ (digamma(r + x) - digamma(r) + np.log(alpha))
+           - w_3 @ log_alpha_T - w_4 @ log_alpha_recency)
+    d_alpha = total_weight * r / alpha - (w_3 * r_x) @ (1 / (alpha + T)) - (w_4 * r_x) @ (1 / (recency + alpha))
+    d_a = x_weights @ (digamma(a + b) - digamma(a + b + x)) + w_4.sum() / a
+    d_b = x_weights @ (digamma(a + b) + digamma(b + x) - digamma(b) - digamma(a + b + x)) - w_4 @ (1 / b_x)
+
+    value = -ll / total_weight + penalizer_coef * np.sum(params ** 2)
+    gradient = (-np.array([d_r, d_alpha, d_a, d_b]) / total_weight + 2 * penalizer_coef * params) * params
+    return value, gradient
+
+
+def fit_bgnbd(frequency, recency, T, penalizer_coef=0.0, weights=None, initial_params=None, tol=1e-7):
+    # weights verilirse girdiler zaten örüntü kabul edilir, verilmezse müşteriler sıkıştırılır.
+    # Dönen seri bgf.params_ ile aynı biçimdedir (r, alpha, a, b).
+    from scipy.optimize import minimize
+
+    if weights is None:
+        patterns, _ = bgnbd_patterns(frequency, recency, T)
+        frequency, recency, T, weights = (patterns[col].to_numpy() for col in ['frequency', 'recency', 'T', 'weights'])
+    frequency, recency, T, weights = (np.asarray(values, dtype=np.float64) for values in (frequency, recency, T, weights))
+
+    scale = 1.0 / T.max()
+    x0 = np.full(4, 0.1) if initial_params is None else np.asarray(initial_params, dtype=np.float64)
+    output = minimize(bgnbd_negative_log_likelihood, x0, jac=True, tol=tol,
+                      args=(frequency, recency * scale, T * scale, weights, penalizer_coef))
+    if not output.success:
+        raise ValueError(f"BG-NBD modeli yakınsamadı ({output.message}); daha büyük penalizer_coef denenebilir")
+
+    params = pd.Series(np.exp(output.x), index=['r', 'alpha', 'a', 'b'])
+    params['alpha'] /= scale
+    return params
+
+
+###############################################################
+# Gamma-Gamma Modelinin Kurulması (Native Gamma-Gamma Fitter)
+###############################################################
+
+# GammaGammaFitter da log-olabilirliği her tekrar eden müşteri için autograd ile hesaplar. Müşteriler
+# tekil (frequency, monetary_value) çiftlerine indirgenir: kesin modda (decimals=None) çiftler olduğu gibi
+# kullanılır, gruplu modda monetary_value decimals basamağa yuvarlanır (decimals=2 kuruş, decimals=0 tam
+# birim); böylece örüntü sayısı müşteri sayısından bağımsız kalır. Amaç fonksiyonu, başlangıç noktası
+# ve L2 cezası lifetimes ile aynıdır. Formüller: Fader & Hardie (2013), "The Gamma-Gamma Model of
+# Monetary Value", denklem (1a) ve (5).
+
+def gamma_gamma_patterns(frequency, monetary_value, decimals=None):
+    # tekil (frequency, monetary_value) örüntüleri ve her müşterinin örüntü numarası
+    frequency = np.asarray(frequency, dtype=np.float64)
+    monetary_value = np.asarray(monetary_value, dtype=np.float64)
+    if decimals is not None:
+        monetary_value = np.round(monetary_value, decimals)
+    if (frequency <= 0).any() or (monetary_value <= 0).any():
+        raise ValueError("Gamma-Gamma modeli için frequency ve monetary_value pozitif olmalı")
+    x_codes, x = pd.factorize(frequency)
+    m_codes, m = pd.factorize(monetary_value)
+    codes, keys = pd.factorize(x_codes.astype(np.int64) * len(m) + m_codes)
+    weights = np.bincount(codes, minlength=len(keys))
+    patterns = pd.DataFrame({'frequency': x[keys // len(m)], 'monetary_value': m[keys % len(m)], 'weights': weights})
+    return patterns, codes
+
+
+def gamma_gamma_negative_log_likelihood(log_params, frequency, monetary_value, weights, penalizer_coef=0.0):
+    # lifetimes GammaGammaFitter._negative_log_likelihood ve log parametrelere göre gradyanı.
+    # p * x yalnızca frequency'ye bağlı olduğundan gammaln/digamma tekil frequency değerlerinde hesaplanır.
+    p, q, v = params = np.exp(log_params)
+    x_codes, x = pd.factorize(frequency)
+    x_weights = np.bincount(x_codes, weights=weights, minlength=len(x))
+    total_weight = x_weights.sum()
+
+    px = p * frequency
+    log_m = np.log(monetary_value)
+    log_x = np.log(frequency)
+    log_xm_v = np.log(frequency * monetary_value + v)
+    ll = (x_weights @ (gammaln(p * x + q) - gammaln(p * x)) - total_weight * (gammaln(q) - q * np.log(v))
+          + weights @ ((px - 1) * log_m + px * log_x - (px + q) * log_xm_v))
+
+    d_p = (x_weights @ (x * (digamma(p * x + q) - digamma(p * x)))
+           + (weights * frequency) @ (log_m + log_x - log_xm_v))
+    d_q = (x_weights @ digamma(p * x + q) - total_weight * (digamma(q) - np.log(v)) - weights @ log_xm_v)
+    d_v = total_weight * q / v - (weights * (px + q)) @ (1 / (frequency * monetary_value + v))
+
+    value = -ll / total_weight + penalizer_coef * np.sum(params ** 2)
+    gradient = (-np.array([d_p, d_q, d_v]) / total_weight + 2 * penalizer_coef * params) * params
+    return value, gradient
+
+
+def fit_gamma_gamma(frequency, monetary_value, penalizer_coef=0.0, weights=None, decimals=None,
+                    initial_params=None, tol=1e-7):
+    # weights verilirse girdiler zaten örüntü kabul edilir, verilmezse müşteriler sıkıştırılır.
+    # Dönen seri ggf.params_ ile aynı biçimdedir (p, q, v).
+    from scipy.optimize import minimize
+
+    if weights is None:
+        patterns, _ = gamma_gamma_patterns(frequency, monetary_value, decimals)
+        frequency, monetary_value, weights = (patterns[col].to_numpy() for col in ['frequency', 'monetary_value', 'weights'])
+    frequency, monetary_value, weights = (np.asarray(values, dtype=np.float64) for values in (frequency, monetary_value, weights))
+
+    x0 = np.full(3, 0.1) if initial_params is None else np.asarray(initial_params, dtype=np.float64)
+    output = minimize(gamma_gamma_negative_log_likelihood, x0, jac=True, tol=tol,
+                      args=(frequency, monetary_value, weights, penalizer_coef))
+    if not output.success:
+        raise ValueError(f"Gamma-Gamma modeli yakınsamadı ({output.message}); daha büyük penalizer_coef denenebilir")
+    return pd.Series(np.exp(output.x), index=['p', 'q', 'v'])
+
+
+def gamma_gamma_expected_profit(params, frequency, monetary_value):
+    # ggf.conditional_expected_average_profit: bireysel ortalama ile kitle ortalamasının ağırlıklı ortalaması.
+    # Gruplu modda kurulan model de burada müşterinin kesin monetary_value değeriyle değerlendirilir.
+    p, q, v = (params[name] for name in ['p', 'q', 'v'])
+    x = np.asarray(frequency, dtype=np.float64)
+    individual_weight = p * x / (p * x + q - 1)
+    expected = individual_weight * np.asarray(monetary_value, dtype=np.float64)
+    expected += (1 - individual_weight) * (v * p / (q - 1))
+    if isinstance(monetary_value, pd.Series):
+        return pd.Series(expected, index=monetary_value.index, name='expected_average_profit')
+    return expected
+
+
+###############################################################
+# Bootstrap Güven Aralıkları (Parallel Bootstrap CLTV Intervals)
+###############################################################
+
+# Müşteriler bir kez (BG-NBD örüntüsü, Gamma-Gamma örüntüsü) çiftlerine sıkıştırılır; her bootstrap
+# örneği bu çiftler üzerinde çok terimli (multinomial) sayılar olarak çekilir, yani satır kopyalanmaz.
+# Sayılar iki modelin örüntü ağırlıklarına toplanır ve iki model işlem havuzunda, tüm veriyle kurulan
+# parametrelerden başlayarak (warm start) yeniden kurulur. Her örnekte müşterilerin CLTV'si bu
+# parametrelerle hesaplanır; müşteri aralıkları için (örnek x müşteri) float32 matrisi tutulur.
+# Örnekler SeedSequence.spawn ile tohumlanır; sonuç işçi sayısından bağımsızdır.
+
+_BOOTSTRAP = {}
+
+
+def _init_bootstrap(state):
+    _BOOTSTRAP.update(state)
+
+
+def _bootstrap_replicate(seed):
+    state = _BOOTSTRAP
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(state['n_customers'], state['pair_probabilities'])
+    bg_weights = np.bincount(state['pair_bg'], weights=counts, minlength=len(state['bg_T']))
+    # pair_gg = 0 tek alışverişli müşteriler (Gamma-Gamma'ya girmez), k > 0 -> (k - 1). örüntü
+    gg_weights = np.bincount(state['pair_gg'], weights=counts, minlength=len(state['gg_x']) + 1)[1:]
+    try:
+        keep = bg_weights > 0
+        scale = 1.0 / state['bg_T'][keep].max()
+        r, alpha, a, b = state['bg_params']
+        bg_params = fit_bgnbd(state['bg_x'][keep], state['bg_recency'][keep], state['bg_T'][keep],
+                              state['bgnbd_penalizer'], weights=bg_weights[keep],
+                              initial_params=np.log([r, alpha * scale, a, b]))
+        keep = gg_weights > 0
+        gg_params = fit_gamma_gamma(state['gg_x'][keep], state['gg_m'][keep], state['gamma_gamma_penalizer'],
+                                    weights=gg_weights[keep], initial_params=np.log(state['gg_params']))
+    except ValueError:
+        return np.full(7, np.nan), None
+    profit = gamma_gamma_expected_profit(gg_params, state['frequency'], state['monetary_value'])
+    clv = customer_lifetime_value(bg_params, state['month'], state['frequency'], state['recency'], state['T'],
+                                  profit, state['discount_rate'], state['freq']).to_numpy()[:, 0]
+    return np.concatenate([bg_params.to_numpy(), gg_params.to_numpy()]), clv.astype(np.float32)
+
+
+def bootstrap_cltv(frequency, recency, T, monetary_value, month=3, n_boot=500, segments=None, level=0.90,
+                   bgnbd_penalizer=0.001, gamma_gamma_penalizer=0.01, decimals=None, discount_rate=0.01, freq='W',
+                   max_workers=None, seed=None):
+    # create_cltv_p'deki cltv_df sütunları verilir; segments verilmezse nokta tahmininden
+    # pd.qcut(clv, 4, labels=["D", "C", "B", "A"]) ile kurulur. Dönen sözlük:
+    # params (örnek x r, alpha, a, b, p, q, v), customers (clv, lower, upper) ve
+    # segments (segment başına ortalama ve toplam CLTV'nin aralıkları).
+    index = frequency.index if isinstance(frequency, pd.Series) else None
+    frequency, recency, T, monetary_value = (np.asarray(values, dtype=np.float64)
+                                             for values in (frequency, recency, T, monetary_value))
+    repeat = frequency > 0
+
+    bg_patterns, bg_codes = bgnbd_patterns(frequency, recency, T)
+    gg_patterns, gg_repeat_codes = gamma_gamma_patterns(frequency[repeat], monetary_value[repeat], decimals)
+    gg_codes = np.full(len(frequency), -1, dtype=np.int64)
+    gg_codes[repeat] = gg_repeat_codes
+    pair_codes, pairs = pd.factorize(bg_codes.astype(np.int64) * (len(gg_patterns) + 1) + gg_codes + 1)
+
+    bg_params = fit_bgnbd(bg_patterns['frequency'], bg_patterns['recency'], bg_patterns['T'], bgnbd_penalizer,
+                          weights=bg_patterns['weights'])
+    gg_params = fit_gamma_gamma(gg_patterns['frequency'], gg_patterns['monetary_value'], gamma_gamma_penalizer,
+                                weights=gg_patterns['weights'])
+    profit = gamma_gamma_expected_profit(gg_params, frequency, monetary_value)
+    clv = customer_lifetime_value(bg_params, month, frequency, recency, T, profit, discount_rate, freq).to_numpy()[:, 0]
+
+    state = {'n_customers': len(frequency),
+             'pair_probabilities': np.bincount(pair_codes, minlength=len(pairs)) / len(frequency),
+             'pair_bg': pairs // (len(gg_patterns) + 1), 'pair_gg': pairs % (len(gg_patterns) + 1),
+             'bg_x': bg_patterns['frequency'].to_numpy(), 'bg_recency': bg_patterns['recency'].to_numpy(),
+             'bg_T': bg_patterns['T'].to_numpy(), 'gg_x': gg_patterns['frequency'].to_numpy(),
+             'gg_m': gg_patterns['monetary_value'].to_numpy(),
+             'bg_params': bg_params.to_numpy(), 'gg_params': gg_params.to_numpy(),
+             'bgnbd_penalizer': bgnbd_penalizer, 'gamma_gamma_penalizer': gamma_gamma_penalizer,
+             'frequency': frequency, 'recency': recency, 'T': T, 'monetary_value': monetary_value,
+             'month': month, 'discount_rate': discount_rate, 'freq': freq}
+
+    if segments is None:
+        segments = pd.qcut(clv, 4, labels=['D', 'C', 'B', 'A'])
+    segments = pd.Categorical(segments)
+    n_segments = len(segments.categories)
+    segment_counts = np.bincount(segments.codes, minlength=n_segments)
+
+    params = np.empty((n_boot, 7))
+    samples = np.empty((n_boot, len(frequency)), dtype=np.float32)
+    segment_sums = np.empty((n_boot, n_segments))
+    seeds = np.random.SeedSequence(seed).spawn(n_boot)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_bootstrap, initargs=(state,)) as pool:
+        chunksize = max(n_boot // (4 * (max_workers or os.cpu_count())), 1)
+        for i, (replicate_params, replicate_clv) in enumerate(pool.map(_bootstrap_replicate, seeds, chunksize=chunksize)):
+            params[i] = replicate_params
+            if replicate_clv is None:
+                samples[i] = np.nan
+                segment_sums[i] = np.nan
+            else:
+                samples[i] = replicate_clv
+                segment_sums[i] = np.bincount(segments.codes, weights=replicate_clv, minlength=n_segments)
+
+    bounds = [(1 - level) / 2, (1 + level) / 2]
+    lower, upper = np.nanquantile(samples, bounds, axis=0)
+    customers = pd.DataFrame({'clv': clv, 'lower': lower, 'upper': upper}, index=index)
+    sum_lower, sum_upper = np.nanquantile(segment_sums, bounds, axis=0)
+    segment_clv = np.bincount(segments.codes, weights=clv, minlength=n_segments)
+    segment_table = pd.DataFrame({'count': segment_counts,
+                                  'mean': segment_clv / segment_counts,
+                                  'mean_lower': sum_lower / segment_counts,
+                                  'mean_upper': sum_upper / segment_counts,
+                                  'sum': segment_clv, 'sum_lower': sum_lower, 'sum_upper': sum_upper},
+                                 index=pd.CategoricalIndex(segments.categories, name='segment'))
+    return {'params': pd.DataFrame(params, columns=['r', 'alpha', 'a', 'b', 'p', 'q', 'v']),
+            'customers': customers, 'segments': segment_table,
+            'failed': int(np.isnan(params[:, 0]).sum())}
@@ -0,0 +1,138 @@
+###############################################################
+# Birleştirilebilir Kantil Özeti (Mergeable Quantile Sketch)
+###############################################################
+
+# pd.qcut her çağrıda tüm sütunu sıralar ve sütunun tamamının tek yerde olmasını ister.
+# KLL özeti (Karnin, Lang, Liberty 2016) her parça/bölüm için ayrı kurulup birleştirilebilir;
+# boyutu O(k log(n / k)) elemandır ve sıra (rank) hatası yaklaşık eps * n ile sınırlıdır.
+
+import numpy as np
+import pandas as pd
+
+
+class KLLSketch:
+    def __init__(self, eps=0.01, seed=0):
+        # k ~ 1.7 / eps: tek bir kantil için normalize sıra hatası yaklaşık eps olur.
+        # seed sabit olduğu için aynı girdi her çalıştırmada aynı özeti (ve sınırları) verir
+        self.eps = eps
+        self.k = max(int(np.ceil(1.7 / eps)), 8)
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        # kapasitesi dolan seviye sıralanır, rastgele tek/çift konumdaki elemanlar
+        # iki kat ağırlıkla bir üst seviyeye taşınır
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                odd = len(items) % 2
+                promoted = items[odd:][self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = items[:odd]
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    @property
+    def size(self):
+        return sum(len(items) for items in self.levels)
+
+    def _sorted_weights(self):
+        if not self.n:
+            raise ValueError("KLL özeti boş: kantil ya da sıra için önce update ile değer eklenmeli")
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def rank(self, values, inclusive=True):
+        # values'dan küçük (inclusive=True ise küçük-eşit) eleman sayısının tahmini
+        items, cumulative = self._sorted_weights()
+        idx = np.searchsorted(items, values, side="right" if inclusive else "left")
+        return np.where(idx > 0, cumulative[np.maximum(idx - 1, 0)], 0.0) * (self.n / cumulative[-1])
+
+    def quantile(self, q):
+        # en küçük ve en büyük değerler kesin tutulur, aradaki kantiller özetten okunur
+        q = np.asarray(q, dtype=np.float64)
+        items, cumulative = self._sorted_weights()
+        idx = np.searchsorted(cumulative, q * cumulative[-1], side="left").clip(0, len(items) - 1)
+        return np.where(q <= 0, self.min, np.where(q >= 1, self.max, items[idx]))
+
+
+def merge_sketches(sketches, seed=0):
+    sketches = list(sketches)
+    merged = KLLSketch(eps=sketches[0].eps, seed=seed)
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+
+def sketch_qcut(values, sketch, labels):
+    # pd.qcut(values, len(labels), labels=labels) yaklaşığı; sınırlar özetten okunur
+    values = np.asarray(values, dtype=np.float64)
+    edges = sketch.quantile(np.linspace(0, 1, len(labels) + 1))
+    # pd.qcut aralıkları (e_i, e_i+1] şeklindedir, ilk aralık en küçük değeri de içerir
+    codes = np.searchsorted(edges[1:-1], values, side="left")
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+
+###############################################################
+# Kesikli Sütunlar İçin Sıra Tabanlı Çeyreklik (Rank-Based qcut)
+###############################################################
+
+# create_rfm frequency için pd.qcut(x.rank(method="first")) kullanır: eşit değerler görülme sırasına
+# göre farklı çeyreklere düşebilir. frequency küçük tamsayılardan oluştuğu için değer sayıları
+# (value_counts) kesin olarak saklanıp toplanabilir; önceki bölümlerdeki eşit değer sayısı (offset)
+# eklenince bölümler ayrı skorlanabilir. Sonuç, bölümlerin (offset sırasıyla) art arda eklendiği
+# tabloda pd.qcut(x.rank(method="first")) ile birebir aynıdır; eşit değerlerin sırası bu birleştirilmiş
+# sıradır, özgün satır sırası farklıysa eşit değerlerin skorları değişebilir.
+
+def merge_value_counts(counts):
+    # counts: bölüm sırasıyla value_counts serileri. Toplam sayılar ve her bölüm için
+    # kendisinden önceki bölümlerdeki sayılar (offset) döner.
+    table = pd.concat(counts, axis=1, ignore_index=True).fillna(0).astype(np.int64).sort_index()
+    offsets = table.cumsum(axis=1) - table
+    return table.sum(axis=1), [offsets[i] for i in range(table.shape[1])]
+
+
+def rank_qcut(values, total_counts, labels, offset=None):
+    values = pd.Series(np.asarray(values))
+    below = total_counts.cumsum() - total_counts
+    rank = values.map(below).to_numpy() + values.groupby(values).cumcount().to_numpy() + 1
+    if offset is not None:
+        rank = rank + values.map(offset).fillna(0).to_numpy()
+    n = total_counts.sum()
+    edges = 1 + (n - 1) * np.linspace(0, 1, len(labels) + 1)
+    codes = np.searchsorted(edges[1:-1], rank, side="left")
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
@@ -0,0 +1,409 @@
+###############################################################
+# Online Retail II Okuma ve Temizleme (Reading & Cleaning)
+###############################################################
+
+# 04_1_cltv.py, 04_2_cltv_prediction.py ve 05_RFM_Project.py aynı Online Retail II verisini okuyup
+# aynı şekilde temizler. Buradaki fonksiyonlar veriyi parça parça (chunk) okur, her parçayı ayrı temizler
+# ve müşteri bazında kısmi toplamlar üretir; böylece bellek kullanımı dosya boyutundan bağımsız kalır.
+# Bellekte kalan tek yapı görülen (Customer ID, Invoice) çiftleridir (çift başına 8 baytlık int64 anahtar);
+# farklı fatura sayısının kesin hesaplanması için gereklidir ve satır sayısından yaklaşık 20 kat küçüktür.
+
+import hashlib
+import os
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+STRING_COLUMNS = ["Invoice", "StockCode", "Description", "Country"]
+
+
+###############################################################
+# Excel'den Sütunsal Formata Dönüştürme (Excel to Parquet)
+###############################################################
+
+def _normalize_dtypes(chunk):
+    # Excel'de Invoice ve StockCode sütunları sayı ve metin karışıktır ("C489449" / 489434),
+    # parçalar arasında şema değişmesin diye metin olarak yazılır.
+    for col in STRING_COLUMNS:
+        chunk[col] = chunk[col].astype(str).where(chunk[col].notna())
+    chunk["Quantity"] = chunk["Quantity"].astype("int64")
+    chunk["InvoiceDate"] = pd.to_datetime(chunk["InvoiceDate"])
+    chunk["Price"] = chunk["Price"].astype("float64")
+    chunk["Customer ID"] = chunk["Customer ID"].astype("float64")
+    return chunk
+
+
+def excel_to_parquet(xlsx_path, parquet_path, sheet_name, chunksize=100_000):
+    # pd.read_excel tüm sayfayı belleğe alır; openpyxl'in read_only modu satırları sırayla okur
+    # ve her chunksize satır ayrı bir Parquet row group olarak yazılır.
+    import openpyxl
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    workbook = openpyxl.load_workbook(xlsx_path, read_only=True)
+    rows = workbook[sheet_name].iter_rows(values_only=True)
+    header = next(rows)
+    writer = None
+    try:
+        for batch in iter(lambda: list(islice(rows, chunksize)), []):
+            chunk = _normalize_dtypes(pd.DataFrame(batch, columns=header))
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+        workbook.close()
+    return parquet_path
+
+
+###############################################################
+# Parça Parça Okuma (Chunked Reading)
+###############################################################
+
+def read_transactions(path, chunksize=1_000_000):
+    # .csv ve .parquet dosyalarını chunksize satırlık DataFrame'ler halinde döndürür
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        yield from pd.read_csv(path, chunksize=chunksize, parse_dates=["InvoiceDate"],
+                               dtype={"Invoice": str, "StockCode": str, "Customer ID": "float64"})
+    elif extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Desteklenmeyen dosya türü: {extension} (.csv veya .parquet olmalı)")
+
+
+def cancelled_invoices(invoice):
+    # iptal edilen faturalar "C" ile başlar. str.contains("C") her satırda regex araması yapar;
+    # Arrow tabanlı str sütunlarda startswith vektörel çalışır, object sütunlarda önek yalnızca
+    # farklı fatura numaraları üzerinde kontrol edilip satırlara dağıtılır.
+    if isinstance(invoice.dtype, pd.StringDtype) and invoice.dtype.storage == "pyarrow":
+        return invoice.str.startswith("C", na=False).to_numpy(dtype=bool)
+    codes, uniques = pd.factorize(invoice)
+    prefix = pd.Series(uniques, dtype=object).str.startswith("C", na=False).to_numpy(dtype=bool)
+    return np.append(prefix, False)[codes]
+
+
+def transaction_mask(dataframe, positive_quantity=True, positive_price=False):
+    # dropna + iptal faturalar + Quantity > 0 (+ Price > 0) filtrelerinin tek boolean maskesi
+    mask = np.ones(len(dataframe), dtype=bool)
+    for col in dataframe.columns:
+        mask &= dataframe[col].notna().to_numpy()
+    mask &= ~cancelled_invoices(dataframe["Invoice"])
+    if positive_quantity:
+        mask &= (dataframe["Quantity"] > 0).to_numpy()
+    if positive_price:
+        mask &= (dataframe["Price"] > 0).to_numpy()
+    return mask
+
+
+def clean_transactions(chunk, positive_price=False, caps=None, positive_quantity=True):
+    # boş değerler, iptal edilen faturalar ("C" ile başlayan) ve Quantity <= 0 satırlar çıkarılır.
+    # positive_price=True create_cltv_p'deki Price > 0 filtresini ekler, positive_quantity=False
+    # create_rfm gibi Quantity filtresini kaldırır,
+    # caps ({"Quantity": üst_sınır, "Price": üst_sınır}) replace_with_thresholds'un bulduğu sınırları uygular.
+    # Filtreler tek maskede birleştirilir ve tablo yalnızca bir kez kopyalanır.
+    chunk = chunk[transaction_mask(chunk, positive_quantity, positive_price)]
+    for col, up_limit in (caps or {}).items():
+        chunk[col] = chunk[col].clip(upper=up_limit)
+    chunk["TotalPrice"] = chunk["Quantity"] * chunk["Price"]
+    return chunk
+
+
+###############################################################
+# Aykırı Değer Baskılama (Percentile Outlier Capping)
+###############################################################
+
+# replace_with_thresholds her sütun için outlier_thresholds'u çağırır (iki ayrı quantile geçişi) ve
+# .loc ile atama yapar. ThresholdCapper tüm sütunların %1 / %99 kantillerini tek bir float64 matris
+# üzerinde tek np.nanquantile çağrısında bulur; sınırlar outlier_thresholds ile aynıdır (kantiller
+# +/- 1.5 * aralık). transform, replace_with_thresholds gibi çağıranın tablosunu yerinde değiştirir
+# (copy=True girdiyi değiştirmez). fit bir dönemde öğrenilen sınırları saklar; transform başka bir
+# döneme ya da dosyanın parçalarına uygulanabilir. Dosyanın tamamı belleğe sığmıyorsa partial_fit
+# parçalardan KLL özetleriyle yaklaşık sınır öğrenir.
+
+class ThresholdCapper:
+    def __init__(self, columns, quantiles=(0.01, 0.99), iqr_factor=1.5, cap_lower=False, eps=0.001):
+        # cap_lower=False: replace_with_thresholds gibi yalnızca üst sınır uygulanır
+        self.columns = list(columns)
+        self.quantiles = quantiles
+        self.iqr_factor = iqr_factor
+        self.cap_lower = cap_lower
+        self.eps = eps
+        self.sketches = None
+        self.thresholds = None
+
+    def _set_thresholds(self, quartile1, quartile3):
+        interquantile_range = quartile3 - quartile1
+        self.thresholds = pd.DataFrame({'low_limit': quartile1 - self.iqr_factor * interquantile_range,
+                                        'up_limit': quartile3 + self.iqr_factor * interquantile_range},
+                                       index=pd.Index(self.columns, name='variable'))
+        return self
+
+    def fit(self, dataframe):
+        # (sütun x satır) kopyası yalnızca kantil için kullanıldığından nanquantile onu yerinde bölümleyebilir
+        values = dataframe[self.columns].to_numpy(dtype=np.float64, copy=True).T
+        quartile1, quartile3 = np.nanquantile(values, self.quantiles, axis=1, overwrite_input=True)
+        return self._set_thresholds(quartile1, quartile3)
+
+    def partial_fit(self, chunk):
+        from quantile_sketch import KLLSketch
+
+        if self.sketches is None:
+            self.sketches = [KLLSketch(self.eps) for _ in self.columns]
+        for sketch, col in zip(self.sketches, self.columns):
+            sketch.update(chunk[col].to_numpy(dtype=np.float64))
+        quartile1, quartile3 = np.array([sketch.quantile(self.quantiles) for sketch in self.sketches]).T
+        return self._set_thresholds(quartile1, quartile3)
+
+    @property
+    def caps(self):
+        # clean_transactions / stream_customer_aggregates için {"Quantity": üst_sınır, ...}
+        return self.thresholds['up_limit'].to_dict()
+
+    def transform(self, dataframe, copy=False):
+        # seçili sütunlar çağıranın tablosunda değiştirilir ve aynı tablo döner; copy=True ise girdi
+        # değişmez, baskılanmış kopya döner. pandas copy-on-write altında sütun tamponuna doğrudan
+        # yazılamadığından her sütun için baskılanmış yeni bir float64 dizi atanır; ek bellek tek sütun
+        # kadardır. Sınırlar float olduğundan tamsayı sütunlar, baskılanan değer olmasa da her zaman
+        # float64 olur (replace_with_thresholds gibi).
+        if self.thresholds is None:
+            raise ValueError("ThresholdCapper önce fit ya da partial_fit ile eğitilmeli")
+        if copy:
+            dataframe = dataframe.copy()
+        for col, low_limit, up_limit in self.thresholds.itertuples():
+            dataframe[col] = dataframe[col].astype(np.float64).clip(low_limit if self.cap_lower else None, up_limit)
+        return dataframe
+
+    def fit_transform(self, dataframe, copy=False):
+        return self.fit(dataframe).transform(dataframe, copy)
+
+
+###############################################################
+# Temizlenmiş Verinin Önbelleği (Cleaned Transaction Cache)
+###############################################################
+
+# pd.read_excel sonraki tüm adımlardan daha uzun sürer. İlk okumada temizlenmiş tablo
+# (TotalPrice hesaplanmış, Country/StockCode kategorik, Customer ID int32) Feather dosyasına yazılır,
+# sonraki çalıştırmalar bu dosyayı bellek eşlemeli (memory-mapped) okur. Dosya adı kaynak dosyanın
+# içerik özetini ve sayfa adını içerir; Excel değişince eski önbellek silinip yenisi yazılır.
+# Önbellekte yalnızca tüm fonksiyonların ortak temizliği (dropna + iptal faturalar) vardır; Quantity > 0
+# ve Price > 0 filtreleri fonksiyona göre değiştiği için okuyan fonksiyonun clean_transactions'ında uygulanır.
+
+CACHE_VERSION = 2
+
+def file_digest(path, block_size=2 ** 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compact_transactions(dataframe):
+    dataframe = dataframe.copy()
+    dataframe["Customer ID"] = dataframe["Customer ID"].astype("int32")
+    dataframe["Country"] = dataframe["Country"].astype("category")
+    dataframe["StockCode"] = dataframe["StockCode"].astype("category")
+    return dataframe.reset_index(drop=True)
+
+
+def read_clean_transactions(xlsx_path, sheet_name, cache_dir="cache"):
+    # dönen tablo Quantity <= 0 ve Price <= 0 satırları da içerir. create_rfm (Quantity filtresi yok),
+    # create_cltv_c (Quantity > 0) ve create_cltv_p (Quantity > 0, Price > 0) kendi clean_transactions
+    # çağrılarıyla eksik filtreleri uygular; temizleme idempotent olduğu için tablo bu fonksiyonlara
+    # doğrudan verilebilir.
+    import pyarrow.feather as feather
+
+    stem = os.path.splitext(os.path.basename(xlsx_path))[0]
+    prefix = f"{stem}__{sheet_name.replace(' ', '_')}__"
+    cache_path = os.path.join(cache_dir, f"{prefix}v{CACHE_VERSION}_{file_digest(xlsx_path)[:16]}.feather")
+
+    if os.path.exists(cache_path):
+        return feather.read_table(cache_path, memory_map=True).to_pandas()
+
+    dataframe = _normalize_dtypes(pd.read_excel(xlsx_path, sheet_name=sheet_name))
+    dataframe = compact_transactions(clean_transactions(dataframe, positive_quantity=False))
+    os.makedirs(cache_dir, exist_ok=True)
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix):
+            os.remove(os.path.join(cache_dir, name))
+    # bellek eşlemeli okuma için sıkıştırmasız yazılır
+    feather.write_feather(dataframe, cache_path, compression="uncompressed")
+    return dataframe
+
+
+###############################################################
+# Tamsayı Fatura Kodları (Compact Invoice Codes)
+###############################################################
+
+# Invoice numaraları metindir ("489434", iptal için "C489449"); müşteri başına farklı fatura sayısı
+# (nunique) her satırda metin hash'i hesaplar. Numaralar bir kez int64 koda çevrilir: alt 32 bit
+# numara, üstteki 5 bit önek harfi (A=1 ... Z=26, önek yoksa 0). Kodlar veriden bağımsız olduğu için
+# parçalar ve bölümler arasında aynıdır. Farklı fatura sayıları hash yerine (müşteri kodu, fatura)
+# çiftlerinin tek int64 anahtara paketlenip sıralanmasıyla bulunur.
+
+INVOICE_CODE_BITS = 37
+INVOICE_PREFIXES = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def encode_invoices(invoice):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if not (isinstance(invoice.dtype, pd.StringDtype) and invoice.dtype.storage == "pyarrow"):
+        invoice = invoice.astype("string[pyarrow]")
+    array = pa.array(invoice)
+    if array.null_count:
+        raise ValueError("Invoice sütununda boş değer var, önce clean_transactions uygulanmalı")
+
+    digits = pc.utf8_ltrim(array, characters=INVOICE_PREFIXES)
+    prefix_length = pc.subtract(pc.utf8_length(array), pc.utf8_length(digits))
+    if (pc.max(prefix_length).as_py() or 0) > 1:
+        raise ValueError("Invoice numaralarında en fazla bir harf öneki olabilir")
+    # sayısal olmayan numaralarda pyarrow.ArrowInvalid (ValueError) yükselir
+    codes = pc.cast(digits, pa.int64()).to_numpy(zero_copy_only=False).copy()
+    if len(codes) and (codes.min() < 0 or codes.max() >= 2 ** 32):
+        raise ValueError("Invoice numaraları 0 ile 2^32 arasında olmalı")
+
+    prefixed = pc.greater(prefix_length, 0).to_numpy(zero_copy_only=False)
+    if prefixed.any():
+        letters = pc.utf8_slice_codeunits(array.filter(pa.array(prefixed)), 0, 1).dictionary_encode()
+        rank = np.array([INVOICE_PREFIXES.index(letter) + 1 for letter in letters.dictionary.to_pylist()],
+                        dtype=np.int64)
+        codes[prefixed] |= rank[letters.indices.to_numpy(zero_copy_only=False)] << 32
+    return codes
+
+
+def customer_codes(customers, known=None):
+    # Customer ID'ler (tamsayı olmak zorunda değil) yoğun int64 kodlara çevrilir. known: önceki
+    # parçalarda görülen ID'ler (kod = konum); bunların kodları korunur, yeni ID'ler sona eklenir.
+    # Kodlar ve güncel ID dizini döner; boş Customer ID'nin kodu -1'dir.
+    codes, uniques = pd.factorize(customers)
+    uniques = pd.Index(uniques, name='Customer ID')
+    if known is None:
+        return codes.astype(np.int64), uniques
+    positions = known.get_indexer(uniques)
+    new = positions < 0
+    positions[new] = len(known) + np.arange(np.count_nonzero(new))
+    codes = np.where(codes < 0, -1, positions[codes]) if len(codes) else codes.astype(np.int64)
+    return codes, known.append(uniques[new]) if new.any() else known
+
+
+def pack_invoice_pairs(codes, invoice_codes):
+    # yoğun müşteri kodu (customer_codes ya da pd.factorize) üst bitlere, fatura kodu alt bitlere
+    # yazılır; anahtar sırası (müşteri kodu, fatura) sırasıyla aynıdır
+    codes = np.asarray(codes, dtype=np.int64)
+    if len(codes) and codes.max() >= 2 ** (63 - INVOICE_CODE_BITS):
+        raise ValueError(f"En fazla 2^{63 - INVOICE_CODE_BITS} farklı Customer ID paketlenebilir")
+    return (codes << INVOICE_CODE_BITS) | invoice_codes
+
+
+def recode_invoice_pairs(keys, codes):
+    # paketlenmiş anahtarlardaki müşteri kodu k, codes[k] ile değiştirilir (parça kodlarından ortak kodlara)
+    return (np.asarray(codes, dtype=np.int64)[keys >> INVOICE_CODE_BITS] << INVOICE_CODE_BITS) \
+        | (keys & (2 ** INVOICE_CODE_BITS - 1))
+
+
+def count_packed_pairs(keys, customers=None):
+    # sıralı ve tekil anahtarlardan müşteri başına fatura sayısı; customers (kod -> Customer ID)
+    # verilirse dizin Customer ID, verilmezse müşteri kodudur
+    codes = keys >> INVOICE_CODE_BITS
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(keys) else np.empty(0, np.int64)
+    index = codes[starts] if customers is None else pd.Index(customers).take(codes[starts])
+    return pd.Series(np.diff(np.r_[starts, len(keys)]), dtype='int64', index=pd.Index(index, name='Customer ID'))
+
+
+def _drop_adjacent_duplicates(keys):
+    return keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+
+
+def unique_pairs(keys):
+    # işlem verisi fatura sırasıyla geldiği için bir faturanın satırları ardışıktır; ardışık tekrarlar
+    # doğrusal bir geçişle atılır ve yalnızca kalan (yaklaşık fatura sayısı kadar) anahtar sıralanır.
+    # np.unique yerine np.sort + ardışık karşılaştırma (np.unique bu boyutlarda belirgin yavaş).
+    return _drop_adjacent_duplicates(np.sort(_drop_adjacent_duplicates(keys)))
+
+
+def distinct_invoice_counts(customers, invoice_codes):
+    # nunique yerine: Customer ID'ler sıralı kodlara çevrilip faturalarla paketlenir, anahtarlar
+    # sıralanıp tekilleştirilir, müşteri blokları sayılır. Dönen seri Customer ID'ye göre sıralıdır;
+    # groupby gibi boş Customer ID'li satırlar atılır.
+    codes, uniques = pd.factorize(np.asarray(customers), sort=True)
+    valid = codes >= 0
+    if not valid.all():
+        codes, invoice_codes = codes[valid], np.asarray(invoice_codes)[valid]
+    keys = unique_pairs(pack_invoice_pairs(codes, invoice_codes))
+    return count_packed_pairs(keys, uniques)
+
+
+###############################################################
+# Müşteri Bazında Kısmi Toplamlar (Partial Customer Aggregates)
+###############################################################
+
+def new_invoice_pairs(invoices, dataframe):
+    # dataframe'deki (Customer ID, Invoice) çiftlerinden invoices içinde olmayanları döndürür
+    pairs = dataframe[['Customer ID', 'Invoice']].drop_duplicates()
+    seen = invoices[invoices['Customer ID'].isin(pairs['Customer ID'].unique())]
+    pairs = pairs.merge(seen, on=['Customer ID', 'Invoice'], how='left', indicator=True)
+    return pairs.loc[pairs['_merge'] == 'left_only', ['Customer ID', 'Invoice']]
+
+
+def empty_customer_aggregates():
+    customers = pd.DataFrame({'first_invoice_date': pd.Series(dtype='datetime64[ns]'),
+                              'last_invoice_date': pd.Series(dtype='datetime64[ns]'),
+                              'total_unit': pd.Series(dtype='int64'),
+                              'total_price': pd.Series(dtype='float64')},
+                             index=pd.Index([], dtype='float64', name='Customer ID'))
+    return {'customers': customers, 'invoices': [], 'customer_ids': None}
+
+
+def update_customer_aggregates(aggregates, chunk):
+    # temizlenmiş bir parçayı müşteri toplamlarına ekler; parçanın (Customer ID, Invoice) çiftleri
+    # paketlenmiş int64 anahtarlar olarak sonda tek seferde tekilleştirilmek üzere saklanır. Müşteri
+    # kodları parçalar arasında ortaktır (customer_ids: kod -> Customer ID).
+    customers = aggregates['customers']
+    grouped = chunk.groupby('Customer ID')
+    delta = pd.DataFrame({'first_invoice_date': grouped['InvoiceDate'].min(),
+                          'last_invoice_date': grouped['InvoiceDate'].max(),
+                          'total_unit': grouped['Quantity'].sum(),
+                          'total_price': grouped['TotalPrice'].sum()})
+
+    merged = customers.reindex(customers.index.union(delta.index))
+    delta = delta.reindex(merged.index)
+    merged['first_invoice_date'] = pd.concat([merged['first_invoice_date'], delta['first_invoice_date']],
+                                             axis=1).min(axis=1)
+    merged['last_invoice_date'] = pd.concat([merged['last_invoice_date'], delta['last_invoice_date']],
+                                            axis=1).max(axis=1)
+    for col in ['total_unit', 'total_price']:
+        merged[col] = merged[col].fillna(0) + delta[col].fillna(0)
+    if pd.api.types.is_integer_dtype(chunk['Quantity']):
+        merged['total_unit'] = merged['total_unit'].astype('int64')
+
+    codes, customer_ids = customer_codes(chunk['Customer ID'], aggregates['customer_ids'])
+    pairs = unique_pairs(pack_invoice_pairs(codes, encode_invoices(chunk['Invoice'])))
+    return {'customers': merged, 'invoices': aggregates['invoices'] + [pairs], 'customer_ids': customer_ids}
+
+
+def finalize_customer_aggregates(aggregates):
+    # farklı fatura sayısı (total_transaction) tüm parçaların çiftleri birleştirilip bir kez sayılır
+    customers = aggregates['customers'].copy()
+    frequency = count_packed_pairs(unique_pairs(np.concatenate([np.empty(0, np.int64)] + aggregates['invoices'])),
+                                   aggregates['customer_ids'])
+    customers.insert(2, 'total_transaction', frequency.reindex(customers.index).astype('int64'))
+    return customers
+
+
+def stream_customer_aggregates(path, chunksize=1_000_000, positive_price=False, caps=None):
+    # dosyayı parça parça okuyup müşteri başına ilk/son fatura tarihi, farklı fatura sayısı,
+    # toplam adet ve toplam tutarı döndürür
+    aggregates = empty_customer_aggregates()
+    for chunk in read_transactions(path, chunksize):
+        aggregates = update_customer_aggregates(aggregates,
+                                                clean_transactions(chunk, positive_price, caps))
+    return finalize_customer_aggregates(aggregates)
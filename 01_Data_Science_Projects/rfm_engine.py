@@ -0,0 +1,382 @@
+###############################################################
+# RFM Motoru (RFM Engine)
+###############################################################
+
+# 05_RFM_Project.py içindeki create_rfm fonksiyonunun ağır adımları burada toplanır.
+# Fonksiyonlar temizlenmiş (iptaller ve boş değerler çıkarılmış, TotalPrice hesaplanmış)
+# Online Retail II verisi üzerinde çalışır.
+
+import datetime as dt
+import os
+import re
+import shutil
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from quantile_sketch import KLLSketch, merge_sketches, merge_value_counts, rank_qcut, sketch_qcut
+from retail_io import distinct_invoice_counts, encode_invoices, new_invoice_pairs, stream_customer_aggregates
+
+
+###############################################################
+# RFM Metriklerinin Hesaplanması (Calculating RFM Metrics)
+###############################################################
+
+def rfm_metrics(dataframe, today_date=dt.datetime(2011, 12, 11)):
+    # lambda yerine pandas'ın yerel groupby indirgemeleri (max, sum) kullanılır,
+    # böylece her müşteri grubu için ayrı Python çağrısı yapılmaz. frequency metin nunique yerine
+    # tamsayı fatura kodlarının sıralanmasıyla sayılır.
+    grouped = dataframe.groupby('Customer ID')
+    rfm = pd.DataFrame({'recency': (today_date - grouped['InvoiceDate'].max()).dt.days,
+                        'frequency': distinct_invoice_counts(dataframe['Customer ID'],
+                                                             encode_invoices(dataframe['Invoice'])),
+                        'monetary': grouped['TotalPrice'].sum()})
+    return rfm
+
+
+###############################################################
+# RFM Skorları ve Segmentler (RFM Scores & Segments)
+###############################################################
+
+SEG_MAP = {
+    r'[1-2][1-2]': 'hibernating',
+    r'[1-2][3-4]': 'at_risk',
+    r'[1-2]5': 'cant_loose',
+    r'3[1-2]': 'about_to_sleep',
+    r'33': 'need_attention',
+    r'[3-4][4-5]': 'loyal_customers',
+    r'41': 'promising',
+    r'51': 'new_customers',
+    r'[4-5][2-3]': 'potential_loyalists',
+    r'5[4-5]': 'champions'
+}
+
+
+def compile_seg_map(seg_map):
+    # R ve F skorları 1-5 arasında olduğu için 25 kombinasyon vardır. Her kombinasyon için
+    # seg_map'te eşleşen ilk desen bulunur (replace(regex=True) ile aynı sonuç) ve 5x5 tabloya yazılır.
+    segments = list(dict.fromkeys(seg_map.values()))
+    lookup = np.full((5, 5), -1, dtype=np.int8)
+    for r in range(1, 6):
+        for f in range(1, 6):
+            for pattern, segment in seg_map.items():
+                if re.fullmatch(pattern, f"{r}{f}"):
+                    lookup[r - 1, f - 1] = segments.index(segment)
+                    break
+    if (lookup < 0).any():
+        raise ValueError("seg_map tüm R-F skor kombinasyonlarını kapsamıyor")
+    return lookup, segments
+
+
+SEG_LOOKUP, SEGMENTS = compile_seg_map(SEG_MAP)
+
+
+def rfm_segments(recency_score, frequency_score, lookup=SEG_LOOKUP, segments=SEGMENTS):
+    # 1-5 arası skorlardan string birleştirme ve regex olmadan kategorik segment sütunu
+    r = np.asarray(recency_score, dtype=np.int8) - 1
+    f = np.asarray(frequency_score, dtype=np.int8) - 1
+    return pd.Categorical.from_codes(lookup[r, f], categories=segments)
+
+
+def rfm_scores(rfm, keep_scores=False):
+    # rfm_metrics çıktısından create_rfm'in döndürdüğü tabloyu üretir;
+    # keep_scores=True recency/frequency/monetary skorlarını da bırakır
+    rfm = rfm[(rfm['monetary'] > 0)].copy()
+
+    rfm["recency_score"] = pd.qcut(rfm['recency'], 5, labels=[5, 4, 3, 2, 1])
+    rfm["frequency_score"] = pd.qcut(rfm["frequency"].rank(method="first"), 5, labels=[1, 2, 3, 4, 5])
+    rfm["monetary_score"] = pd.qcut(rfm['monetary'], 5, labels=[1, 2, 3, 4, 5])
+
+    rfm['segment'] = rfm_segments(rfm['recency_score'], rfm['frequency_score'])
+    columns = ["recency", "frequency", "monetary", "segment"]
+    if keep_scores:
+        columns[3:3] = ["recency_score", "frequency_score", "monetary_score"]
+    rfm = rfm[columns]
+    rfm.index = rfm.index.astype(int)
+    return rfm
+
+
+def rfm_sketches(rfm, eps=0.01):
+    # bir bölüm için recency ve monetary KLL özetleri, frequency için kesin değer sayıları
+    rfm = rfm[(rfm['monetary'] > 0)]
+    return {'recency': KLLSketch(eps).update(rfm['recency']),
+            'frequency': rfm['frequency'].value_counts(),
+            'monetary': KLLSketch(eps).update(rfm['monetary'])}
+
+
+def merge_rfm_sketches(sketches):
+    # bölüm sırasıyla verilen özetleri birleştirir; her bölüm için frequency offset'i döner
+    frequency, offsets = merge_value_counts([s['frequency'] for s in sketches])
+    merged = {'recency': merge_sketches([s['recency'] for s in sketches]),
+              'frequency': frequency,
+              'monetary': merge_sketches([s['monetary'] for s in sketches])}
+    return merged, offsets
+
+
+def rfm_scores_approx(rfm, sketches, frequency_offset=None):
+    # rfm_scores ile aynı biçimde çıktı; çeyreklik sınırları tüm bölümlerden birleştirilmiş özetlerden
+    # okunur, bu yüzden her bölüm ayrı skorlanabilir. recency/monetary yaklaşık; frequency, bölümlerin
+    # merge_rfm_sketches sırasıyla art arda eklendiği tablo üzerindeki rfm_scores ile kesin aynıdır
+    # (eşit frequency değerleri bu sırada numaralanır, özgün satır sırasında değil).
+    rfm = rfm[(rfm['monetary'] > 0)].copy()
+
+    rfm["recency_score"] = sketch_qcut(rfm['recency'], sketches['recency'], labels=[5, 4, 3, 2, 1])
+    rfm["frequency_score"] = rank_qcut(rfm['frequency'], sketches['frequency'], labels=[1, 2, 3, 4, 5],
+                                       offset=frequency_offset)
+    rfm["monetary_score"] = sketch_qcut(rfm['monetary'], sketches['monetary'], labels=[1, 2, 3, 4, 5])
+
+    rfm['segment'] = rfm_segments(rfm['recency_score'], rfm['frequency_score'])
+    rfm = rfm[["recency", "frequency", "monetary", "segment"]]
+    rfm.index = rfm.index.astype(int)
+    return rfm
+
+
+###############################################################
+# Artımlı RFM (Incremental RFM State Store)
+###############################################################
+
+# Her çalıştırmada tüm fatura geçmişini taramak yerine müşteri bazında birikimli durum saklanır:
+#   customers: son fatura tarihi, farklı fatura sayısı ve toplam harcama (index: Customer ID)
+#   invoices : görülen (Customer ID, Invoice) çiftleri; farklı fatura sayısının günler arasında
+#              aynı fatura tekrar gelse bile kesin kalması için tutulur.
+# Yeni günün temizlenmiş satırları update_rfm_state ile eklenir, recency ve skorlar sonda yeniden hesaplanır.
+
+def empty_rfm_state():
+    customers = pd.DataFrame({'last_invoice_date': pd.Series(dtype='datetime64[ns]'),
+                              'frequency': pd.Series(dtype='int64'),
+                              'monetary': pd.Series(dtype='float64')},
+                             index=pd.Index([], dtype='float64', name='Customer ID'))
+    invoices = pd.DataFrame({'Customer ID': pd.Series(dtype='float64'),
+                             'Invoice': pd.Series(dtype='object')})
+    return {'customers': customers, 'invoices': invoices}
+
+
+def load_rfm_state(path):
+    if not os.path.exists(path):
+        return empty_rfm_state()
+    return pd.read_pickle(path)
+
+
+def save_rfm_state(state, path):
+    pd.to_pickle(state, path)
+
+
+def update_rfm_state(state, dataframe):
+    customers, invoices = state['customers'], state['invoices']
+
+    # daha önce görülmüş (müşteri, fatura) çiftleri farklı fatura sayısını artırmaz
+    pairs = new_invoice_pairs(invoices, dataframe)
+
+    grouped = dataframe.groupby('Customer ID')
+    delta = pd.DataFrame({'last_invoice_date': grouped['InvoiceDate'].max(),
+                          'frequency': pairs.groupby('Customer ID').size(),
+                          'monetary': grouped['TotalPrice'].sum()})
+    delta['frequency'] = delta['frequency'].fillna(0).astype('int64')
+
+    merged = customers.reindex(customers.index.union(delta.index))
+    delta = delta.reindex(merged.index)
+    merged['last_invoice_date'] = pd.concat([merged['last_invoice_date'], delta['last_invoice_date']],
+                                            axis=1).max(axis=1)
+    merged['frequency'] = merged['frequency'].fillna(0).astype('int64') + delta['frequency'].fillna(0).astype('int64')
+    merged['monetary'] = merged['monetary'].fillna(0) + delta['monetary'].fillna(0)
+
+    return {'customers': merged,
+            'invoices': pd.concat([invoices, pairs], ignore_index=True)}
+
+
+def rfm_from_state(state, today_date=dt.datetime(2011, 12, 11)):
+    customers = state['customers']
+    return pd.DataFrame({'recency': (today_date - customers['last_invoice_date']).dt.days,
+                         'frequency': customers['frequency'],
+                         'monetary': customers['monetary']})
+
+
+def incremental_rfm(dataframe, path, today_date=dt.datetime(2011, 12, 11)):
+    # durumu yükle, yeni satırları ekle, kaydet ve create_rfm ile aynı formatta skorla
+    state = update_rfm_state(load_rfm_state(path), dataframe)
+    save_rfm_state(state, path)
+    return rfm_scores(rfm_from_state(state, today_date))
+
+
+def stream_rfm(path, today_date=dt.datetime(2011, 12, 11), chunksize=1_000_000):
+    # .csv/.parquet kaynağını parça parça okuyup rfm_metrics ile aynı formatta metrikleri döndürür.
+    # Not: akış okuyucu create_rfm'den farklı olarak Quantity <= 0 satırları da çıkarır.
+    customers = stream_customer_aggregates(path, chunksize)
+    return pd.DataFrame({'recency': (today_date - customers['last_invoice_date']).dt.days,
+                         'frequency': customers['total_transaction'],
+                         'monetary': customers['total_price']})
+
+
+###############################################################
+# Çok Dönemli RFM (Multi-Period RFM Snapshots)
+###############################################################
+
+# Her referans tarihi (örneğin ay sonları) için o tarihten önceki faturalarla RFM hesaplanır.
+# Her tarih için veriyi yeniden taramak yerine satırlar referans tarihleri arasındaki dönemlere ayrılır,
+# müşteri x dönem toplamları tek groupby ile bulunur ve dönemler boyunca kümülatif toplanır.
+
+def rfm_snapshots(dataframe, snapshot_dates):
+    # tekrar eden tarihler atılır ve tarihler sıralanır. Her tarih gün sonunu kapsar:
+    # snapshot D için InvoiceDate < D + 1 gün (gece yarısı) olan faturalar alınır ve recency bu
+    # kesim anına göre hesaplanır (today_date = son günün ertesi geleneği). Müşterisi olmayan
+    # tarihler (verinin başlangıcından önceki tarihler) sonuçta yer almaz.
+    snapshot_dates = pd.DatetimeIndex(snapshot_dates).unique().sort_values()
+    cutoffs = snapshot_dates.normalize() + pd.Timedelta(days=1)
+    n_periods = len(cutoffs)
+
+    # period = k: cutoffs[k-1] <= InvoiceDate < cutoffs[k]; k. tarih 0..k dönemlerini kapsar
+    period = np.searchsorted(cutoffs.values.astype('datetime64[ns]'),
+                             dataframe['InvoiceDate'].values.astype('datetime64[ns]'), side='right')
+    mask = period < n_periods
+    data = dataframe.loc[mask, ['Customer ID', 'Invoice', 'InvoiceDate', 'TotalPrice']].assign(period=period[mask])
+    periods = pd.RangeIndex(n_periods, name='period')
+
+    grouped = data.groupby(['Customer ID', 'period'])
+    # faturası olmayan dönem sütunları reindex sonrası tamamen NaT olur ve datetime tipini kaybeder,
+    # bu yüzden tip yeniden verilir
+    last_date = grouped['InvoiceDate'].max().unstack().reindex(columns=periods).astype('datetime64[ns]')
+    monetary = grouped['TotalPrice'].sum().unstack(fill_value=0).reindex(columns=periods, fill_value=0)
+    # bir fatura, ilk görüldüğü dönemde sayılır
+    first_period = data.groupby(['Customer ID', 'Invoice'])['period'].min()
+    frequency = (first_period.groupby([first_period.index.get_level_values('Customer ID'), first_period])
+                 .size().unstack(fill_value=0).reindex(index=monetary.index, columns=periods, fill_value=0))
+
+    # tarihler dönemler boyunca artar, bu yüzden ffill kümülatif max ile aynıdır
+    last_date = last_date.ffill(axis=1)
+    monetary = monetary.cumsum(axis=1)
+    frequency = frequency.cumsum(axis=1)
+
+    snapshots = {}
+    for k, (snapshot_date, cutoff) in enumerate(zip(snapshot_dates, cutoffs)):
+        active = frequency[k] > 0
+        if not active.any():
+            continue
+        rfm = pd.DataFrame({'recency': (cutoff - last_date.loc[active, k]).dt.days,
+                            'frequency': frequency.loc[active, k],
+                            'monetary': monetary.loc[active, k]})
+        snapshots[snapshot_date] = rfm_scores(rfm)
+    if not snapshots:
+        raise ValueError("Snapshot tarihlerinin hiçbirinde müşteri yok.")
+    return pd.concat(snapshots, names=['snapshot_date', 'Customer ID'])
+
+
+def segment_transitions(snapshots, normalize=False):
+    # ardışık iki tarihte de bulunan müşteriler için segment -> segment geçiş matrisleri;
+    # normalize=True satırları (önceki segment) oranlara çevirir
+    segments = snapshots['segment'].unstack(level='snapshot_date')
+    dates = segments.columns
+    transitions = {}
+    for previous, current in zip(dates[:-1], dates[1:]):
+        pair = segments[[previous, current]].dropna()
+        matrix = pd.crosstab(pd.Categorical(pair[previous], categories=SEGMENTS),
+                             pd.Categorical(pair[current], categories=SEGMENTS),
+                             rownames=['from_segment'], colnames=['to_segment'], dropna=False)
+        if normalize:
+            matrix = matrix.div(matrix.sum(axis=1).replace(0, np.nan), axis=0).fillna(0)
+        transitions[(previous, current)] = matrix
+    return transitions
+
+
+###############################################################
+# Bölümlere Göre Paralel RFM (Partitioned RFM with a Process Pool)
+###############################################################
+
+# Skorlar (çeyreklikler) tüm müşteriler yerine her bölüm (örneğin Country) içinde ayrı hesaplanır.
+# Bölümler ana süreçte bir kez Feather (Arrow IPC) dosyalarına yazılır; işçi süreçler yalnızca
+# dosya yolunu alır ve veriyi bellek eşlemeli okur, DataFrame kopyaları süreçler arasında taşınmaz.
+
+def _qcut_scorable(rfm, q=5):
+    # rfm_scores'taki pd.qcut çağrıları q farklı aralık bulabilir mi: recency, frequency sırası ve
+    # monetary kantillerinde tekrar eden (ya da boş bölümde NaN) sınır olmamalı
+    rfm = rfm[(rfm['monetary'] > 0)]
+    edges = np.linspace(0, 1, q + 1)
+    columns = [rfm['recency'], rfm['frequency'].rank(method='first'), rfm['monetary']]
+    return all(col.quantile(edges).nunique() == q + 1 for col in columns)
+
+
+def _score_partition(path, today_date):
+    import pyarrow.feather as feather
+
+    dataframe = feather.read_table(path, memory_map=True).to_pandas()
+    rfm = rfm_metrics(dataframe, today_date)
+    # çeyreklik sınırları bulunamayan (çok az müşterili) bölüm atlanır; diğer hatalar çağırana iletilir
+    if not _qcut_scorable(rfm):
+        return None
+    return rfm_scores(rfm)
+
+
+def partitioned_rfm(dataframe, key='Country', today_date=dt.datetime(2011, 12, 11), max_workers=None):
+    import pyarrow.feather as feather
+
+    columns = ['Customer ID', 'Invoice', 'InvoiceDate', 'TotalPrice']
+    workdir = tempfile.mkdtemp(prefix='rfm_partitions_')
+    try:
+        paths = {}
+        for i, (value, partition) in enumerate(dataframe.groupby(key, observed=True, sort=True)):
+            paths[value] = os.path.join(workdir, f'{i}.feather')
+            feather.write_feather(partition[columns].reset_index(drop=True), paths[value],
+                                  compression='uncompressed')
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {value: pool.submit(_score_partition, path, today_date) for value, path in paths.items()}
+            results = {value: future.result() for value, future in futures.items()}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    skipped = [value for value, rfm in results.items() if rfm is None]
+    if skipped:
+        warnings.warn(f"Çeyreklik skorlanamayan bölümler atlandı: {skipped}")
+    scored = {value: rfm for value, rfm in results.items() if rfm is not None}
+    return pd.concat(scored, names=[key, 'Customer ID'])
+
+
+###############################################################
+# Kompakt RFM Tablosu (Compact RFM Layout)
+###############################################################
+
+# create_rfm çıktısı float64/int64 sütunlardan oluşur ve rfm.to_csv ile metin olarak yazılır.
+# Kompakt düzende Customer ID int32 (sığmazsa int64), recency uint16, frequency uint32, monetary float32,
+# skorlar uint8 ve segment kategoriktir; dosya sıkıştırmasız Feather olarak yazılıp bellek eşlemeli okunur.
+
+COMPACT_DTYPES = {'recency': 'uint16', 'frequency': 'uint32', 'monetary': 'float32',
+                  'recency_score': 'uint8', 'frequency_score': 'uint8', 'monetary_score': 'uint8'}
+
+
+def compact_rfm(rfm):
+    # rfm_scores çıktısını (keep_scores=True ile ya da olmadan) kompakt tiplere çevirir
+    index = rfm.index.to_numpy(dtype=np.int64)
+    info = np.iinfo('int32')
+    if len(index) and (index.min() < info.min or index.max() > info.max):
+        compact = pd.DataFrame(index=pd.Index(index, name='Customer ID'))
+    else:
+        compact = pd.DataFrame(index=pd.Index(index.astype('int32'), name='Customer ID'))
+    for col, dtype in COMPACT_DTYPES.items():
+        if col not in rfm.columns:
+            continue
+        values = np.asarray(rfm[col], dtype=np.float64)
+        if np.issubdtype(np.dtype(dtype), np.integer):
+            info = np.iinfo(dtype)
+            if len(values) and (values.min() < info.min or values.max() > info.max):
+                raise ValueError(f"{col} sütunu {dtype} aralığına sığmıyor")
+        compact[col] = values.astype(dtype)
+    compact['segment'] = pd.Categorical(rfm['segment'], categories=SEGMENTS)
+    return compact
+
+
+def write_rfm(rfm, path):
+    import pyarrow.feather as feather
+
+    feather.write_feather(compact_rfm(rfm).reset_index(), path, compression='uncompressed')
+
+
+def read_rfm(path):
+    import pyarrow.feather as feather
+
+    # set_index Customer ID'yi int64'e genişletir; dizin dosyadaki tiple (int32 ya da int64) yeniden kurulur
+    table = feather.read_table(path, memory_map=True)
+    rfm = table.drop(['Customer ID']).to_pandas()
+    rfm.index = pd.Index(table.column('Customer ID').to_numpy(), name='Customer ID')
+    return rfm
@@ -0,0 +1,136 @@
+###############################################################
+# RFM Sorgu Servisi (RFM Scoring Service)
+###############################################################
+
+# CRM tek tek müşteri segmenti sorar; her sorguda rfm.csv'yi pandas ile okuyup filtrelemek yerine
+# create_rfm çıktısı bir kez yüklenir, Customer ID üzerinde hash indeks ve segment başına
+# ters indeks (müşteri listesi) kurulur. Servis satır tabanlı basit bir protokolle TCP ya da
+# Unix soketi üzerinden cevap verir; her cevap tek satırlık JSON'dur.
+#
+#   GET <customer_id>             -> {"customer_id": ..., "recency": ..., ..., "segment": ...} ya da null
+#   IN <segment> <customer_id>    -> true / false
+#   COUNT <segment>               -> müşteri sayısı
+#   SEGMENT <segment> [limit]     -> müşteri id listesi
+#
+# Kullanım:
+#   python rfm_service.py rfm.feather --port 8765
+#   python rfm_service.py rfm.csv --unix /tmp/rfm.sock
+
+import argparse
+import asyncio
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from rfm_engine import read_rfm
+
+
+###############################################################
+# İndeksler (Customer & Segment Indexes)
+###############################################################
+
+class RFMIndex:
+    def __init__(self, rfm):
+        # pd.Index, Customer ID -> satır numarası için hash tablosu kullanır (get_loc)
+        self.customers = pd.Index(np.asarray(rfm.index, dtype=np.int64))
+        segment = pd.Categorical(rfm['segment'])
+        self.segments = list(segment.categories)
+        self.segment_codes = {name: code for code, name in enumerate(self.segments)}
+        self.codes = segment.codes
+        self.recency = np.asarray(rfm['recency']).tolist()
+        self.frequency = np.asarray(rfm['frequency']).tolist()
+        self.monetary = np.asarray(rfm['monetary'], dtype=np.float64).tolist()
+        # segment -> sıralı müşteri id dizisi
+        order = np.argsort(self.codes, kind='stable')
+        bounds = np.searchsorted(self.codes[order], np.arange(len(self.segments) + 1))
+        ids = np.asarray(self.customers)[order]
+        self.members = {name: ids[bounds[code]:bounds[code + 1]] for name, code in self.segment_codes.items()}
+
+    def _position(self, customer_id):
+        try:
+            return self.customers.get_loc(customer_id)
+        except KeyError:
+            return None
+
+    def get(self, customer_id):
+        pos = self._position(customer_id)
+        if pos is None:
+            return None
+        return {'customer_id': customer_id,
+                'recency': self.recency[pos],
+                'frequency': self.frequency[pos],
+                'monetary': self.monetary[pos],
+                'segment': self.segments[self.codes[pos]]}
+
+    def contains(self, segment, customer_id):
+        pos = self._position(customer_id)
+        return pos is not None and bool(self.codes[pos] == self.segment_codes.get(segment, -1))
+
+    def count(self, segment):
+        return len(self.members.get(segment, ()))
+
+    def segment_members(self, segment, limit=None):
+        return self.members.get(segment, np.empty(0, dtype=np.int64))[:limit].tolist()
+
+
+def load_index(path):
+    if os.path.splitext(path)[1].lower() == '.csv':
+        return RFMIndex(pd.read_csv(path, index_col='Customer ID'))
+    return RFMIndex(read_rfm(path))
+
+
+###############################################################
+# Servis (asyncio Server)
+###############################################################
+
+def answer(index, line):
+    parts = line.split()
+    try:
+        command = parts[0].upper()
+        if command == 'GET':
+            result = index.get(int(parts[1]))
+        elif command == 'IN':
+            result = index.contains(parts[1], int(parts[2]))
+        elif command == 'COUNT':
+            result = index.count(parts[1])
+        elif command == 'SEGMENT':
+            result = index.segment_members(parts[1], int(parts[2]) if len(parts) > 2 else None)
+        else:
+            result = {'error': f'bilinmeyen komut: {parts[0]}'}
+    except (IndexError, ValueError):
+        result = {'error': f'geçersiz sorgu: {line.strip()}'}
+    return (json.dumps(result) + '\n').encode()
+
+
+async def start_server(index, host='127.0.0.1', port=8765, unix_path=None):
+    async def handle(reader, writer):
+        try:
+            while line := await reader.readline():
+                writer.write(answer(index, line.decode()))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    if unix_path:
+        return await asyncio.start_unix_server(handle, path=unix_path)
+    return await asyncio.start_server(handle, host, port)
+
+
+async def serve(path, host='127.0.0.1', port=8765, unix_path=None):
+    index = load_index(path)
+    server = await start_server(index, host, port, unix_path)
+    print(f"{len(index.customers):,} müşteri yüklendi, {unix_path or f'{host}:{port}'} dinleniyor")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', help='create_rfm çıktısı (.csv ya da write_rfm ile yazılmış .feather)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', dest='unix_path')
+    args = parser.parse_args()
+    asyncio.run(serve(args.path, args.host, args.port, args.unix_path))